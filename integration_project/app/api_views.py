@@ -3,52 +3,209 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import generics
-from django.db.models import Count
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.utils.urls import replace_query_param
+from django.utils.decorators import method_decorator
+import base64
+import binascii
 
+from . import stats
+from .commodities import InvalidCommodity, commodity_names, validate_commodity_fields
+from .generation import conditional_on_generation, query_year_range
+from .commodity_store import COLUMNAR_ENCODING, encode_years, get_commodity_store, prices_to_list
 from .models import Conflict, Commodity
-from .serializers import ConflictYearlySerializer, ConflictSerializer, ConflictTypeSerializer, CommoditySerializer
+from .routers import read_from_replica
+from .tables import keyset_filter
+from .serializers import ConflictYearlySerializer, ConflictSerializer, ConflictTypeSerializer, CommoditySerializer, get_fast_serializer
 
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(), name='get')
 class ConflictYearlyDataAPI(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        conflicts = Conflict.objects.values('year').annotate(
-            total=Count('conflict_id')
-        ).order_by('year')
+        conflicts = stats.yearly_totals()
 
         serializer = ConflictYearlySerializer(conflicts, many=True)
         return Response({'yearly_data': serializer.data})
 
+class ConflictKeysetPagination(BasePagination):
+    """
+    Keyset pagination on (year, conflict_id).
+
+    A page is the rows after the cursor's key in that order (or before it,
+    for ``previous`` links), so every page is an indexed range scan and no
+    row is repeated or skipped however many rows share a year. The cursor is
+    an opaque token holding the direction and the full key.
+    """
+    ordering = ('year', 'conflict_id')
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        backwards, position = self.decode_cursor(request)
+
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(self.ordering, position, descending=backwards))
+        prefix = '-' if backwards else ''
+        rows = list(queryset.order_by(*(prefix + name for name in self.ordering))[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+
+        # Coming from a cursor means there are rows on that side of it.
+        self.has_next = position is not None if backwards else has_more
+        self.has_previous = has_more if backwards else position is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size,
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def decode_cursor(self, request):
+        """``(backwards, key)`` from the cursor parameter; ``(False, None)`` for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+        try:
+            direction, *key = base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii').split(',')
+            if direction not in ('n', 'p') or len(key) != len(self.ordering):
+                raise ValueError
+            return direction == 'p', tuple(int(value) for value in key)
+        except (ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, backwards, row):
+        key = ','.join(['p' if backwards else 'n', *(str(getattr(row, name)) for name in self.ordering)])
+        token = base64.urlsafe_b64encode(key.encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(True, self.page[0])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(year_range=query_year_range('year_from', 'year_to')), name='get')
 class ConflictListAPI(generics.ListAPIView):
+    """
+    Conflicts, cursor-paginated on (year, conflict_id).
+
+    fields: comma separated sparse fieldset, narrows the SELECT and the output
+    year_from, year_to: inclusive year range
+    type: type_of_conflict
+    intensity: intensity_level
+    """
     permission_classes = [IsAuthenticated]
 
-    queryset = Conflict.objects.all()
     serializer_class = ConflictSerializer
+    pagination_class = ConflictKeysetPagination
+
+    # query param -> ORM lookup
+    FILTERS = {
+        'year_from': 'year__gte',
+        'year_to': 'year__lte',
+        'type': 'type_of_conflict',
+        'intensity': 'intensity_level',
+    }
+
+    def get_requested_fields(self):
+        value = self.request.query_params.get('fields')
+        if not value:
+            return None
+        fields = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = set(fields) - set(get_fast_serializer(ConflictSerializer).field_names)
+        if unknown:
+            raise ValidationError({'fields': f'Unknown fields: {", ".join(sorted(unknown))}'})
+        return fields
+
+    def get_queryset(self):
+        queryset = Conflict.objects.all()
+
+        filters = {}
+        for param, lookup in self.FILTERS.items():
+            value = self.request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                filters[lookup] = int(value)
+            except ValueError:
+                raise ValidationError({param: 'Must be an integer.'})
+        return queryset.filter(**filters)
 
-from django.db.models import Count
+    def list(self, request, *args, **kwargs):
+        # Same output as ConflictSerializer, built straight from values_list()
+        # rows; only the selected fields and the pagination keys are read.
+        fields = self.get_requested_fields()
+        serializer = get_fast_serializer(ConflictSerializer, tuple(fields) if fields else None)
+        rows = serializer.values(
+            self.filter_queryset(self.get_queryset()),
+            extra=ConflictKeysetPagination.ordering,
+        )
+        page = self.paginate_queryset(rows)
+        return self.get_paginated_response(serializer.to_representation(page))
 
+
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(), name='get')
 class ConflictIntensityDataApi(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        intensity_data = Conflict.objects.values('year', 'intensity_level').annotate(
-            count=Count('conflict_id')
-        ).order_by('year', 'intensity_level')
+        intensity_data = stats.yearly_intensity_counts()
 
         return Response({'intensity_data': intensity_data})
 
     
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(), name='get')
 class ConflictTypesDataApi(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        conflict_types = Conflict.objects.values('type_of_conflict').annotate(
-            total=Count('conflict_id')
-        ).order_by('type_of_conflict')
+        conflict_types = stats.type_counts()
 
         serializer = ConflictTypeSerializer(conflict_types, many=True)
         return Response({'conflict_types': serializer.data})
 
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(), name='get')
+class ConflictStatsAPI(APIView):
+    """All conflict breakdowns in one payload; see stats.conflict_stats()."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response(stats.conflict_stats())
+
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(), name='get')
 class CommodityListAPI(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -58,33 +215,83 @@ class CommodityListAPI(APIView):
             return Response({"error": "Missing 'commodity' parameter"}, status=400)
 
         try:
-            # Check if the field exists on the model
-            if not hasattr(Commodity, commodity_field):
+            # Check if the field is a commodity column
+            try:
+                validate_commodity_fields([commodity_field])
+            except InvalidCommodity:
                 return Response({"error": f"Invalid commodity field: {commodity_field}"}, status=400)
 
-            # Fetch all objects with a non-null value for this commodity
-            commodities = Commodity.objects.exclude(**{f"{commodity_field}__isnull": True}).order_by('year')
+            # Years with a price for this commodity
+            years, series = get_commodity_store().batch_series([commodity_field])
+            prices = series[commodity_field]
 
-            years = []
-            prices = []
-
-            for item in commodities:
-                value = getattr(item, commodity_field)
-                if value is not None:
-                    years.append(item.year)
-                    prices.append(value)
-
-            if not years:
+            if not len(years):
                 return Response({"error": "No data found for this commodity."}, status=404)
 
             # You can map the field to a human-readable name if needed
             commodity_name = commodity_field.replace("_", " ").title()
 
+            if request.query_params.get('encoding') == COLUMNAR_ENCODING:
+                return Response({
+                    "encoding": COLUMNAR_ENCODING,
+                    "commodity_name": commodity_name,
+                    "years": encode_years(years),
+                    "prices": prices.tolist()
+                })
+
             return Response({
                 "commodity_name": commodity_name,
-                "years": years,
-                "prices": prices
+                "years": years.tolist(),
+                "prices": prices.tolist()
             })
 
         except Exception as e:
             return Response({"error": str(e)}, status=500)
+
+
+@method_decorator(read_from_replica, name='get')
+@method_decorator(conditional_on_generation(year_range=query_year_range('from', 'to')), name='get')
+class CommoditySeriesAPI(APIView):
+    """
+    Price series for several commodities in one request, aligned on a
+    shared year axis: ?commodities=cocoa,gold_troy_oz&from=1990&to=2020
+
+    Served from the CommodityStore, which holds every commodity column (the
+    table is one row per year) after one query per data generation, so the
+    requested columns are picked in memory rather than projected in SQL.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        names = []
+        for value in request.query_params.getlist('commodities'):
+            for name in value.split(','):
+                name = name.strip()
+                if name and name not in names:
+                    names.append(name)
+        if not names:
+            return Response({"error": "Missing 'commodities' parameter"}, status=400)
+
+        try:
+            validate_commodity_fields(names)
+            year_from = request.query_params.get('from') or None
+            year_to = request.query_params.get('to') or None
+            year_from = int(year_from) if year_from is not None else None
+            year_to = int(year_to) if year_to is not None else None
+        except InvalidCommodity as e:
+            return Response({"error": str(e)}, status=400)
+        except ValueError:
+            return Response({"error": "'from' and 'to' must be years"}, status=400)
+
+        years, series = get_commodity_store().batch_series(names, year_from, year_to)
+
+        return Response({
+            "years": years.tolist(),
+            "series": {
+                name: {
+                    "commodity_name": commodity_names.get(name, name.replace("_", " ").title()),
+                    "prices": prices_to_list(prices),
+                }
+                for name, prices in series.items()
+            },
+        })
@@ -0,0 +1,29 @@
+"""
+URLconf for requests served through ASGI: app.urls with the JSON chart
+endpoints and the correlation export swapped for their async versions in
+async_views.py.
+"""
+from django.urls import path
+
+from . import async_views
+from . import urls
+
+app_name = 'app'
+
+async_urlpatterns = [
+    path('api/dashboard/commodity/', async_views.dashboard_commodity_api, name='dashboard_commodity_api'),
+    path('api/dashboard/conflict/', async_views.dashboard_conflict_api, name='dashboard_conflict_api'),
+    path('api/conflict-data/', async_views.conflict_yearly_data_api, name='conflict_data_api'),
+    path('api/conflict-intensity/', async_views.conflict_intensity_api, name='conflict-intensity-api'),
+    path('api/conflict-types/', async_views.conflict_types_api, name='conflict-type-api'),
+    path('api/conflict-stats/', async_views.conflict_stats_api, name='conflict-stats-api'),
+    path('api/commodities/', async_views.commodity_list_api, name='commodity-list'),
+    path('api/commodities/series/', async_views.commodity_series_api, name='commodity-series'),
+    path('correlations/export/', async_views.correlation_export, name='correlation_export'),
+]
+
+_replaced = {pattern.name for pattern in async_urlpatterns}
+
+urlpatterns = async_urlpatterns + [
+    pattern for pattern in urls.urlpatterns if pattern.name not in _replaced
+]
@@ -0,0 +1,238 @@
+"""
+Async versions of the JSON chart endpoints and of the correlation export.
+
+Requests that come in through ASGI are routed here instead of to the sync
+views in views.py and api_views.py (see middleware.async_views_middleware
+and async_urls.py), so one ASGI worker can keep many chart requests in
+flight while their queries run, and streams exports without buffering them. The payloads, status codes and caching
+headers are the same as the sync views'; the REST ones answer like the REST
+framework does (compact JSON, 403 with a 'detail' for anonymous users).
+
+The paginated conflict list (api/conflicts/) stays a REST framework view,
+which Django runs in a thread under ASGI.
+"""
+from functools import wraps
+
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import NotAuthenticated
+
+from . import stats
+from .commodities import InvalidCommodity, commodity_names, validate_commodity_fields
+from .commodity_store import COLUMNAR_ENCODING, aget_commodity_store, encode_years, prices_to_list
+from .exports import aencode
+from .generation import conditional_on_generation, query_year_range
+from .routers import read_from_replica
+from .serializers import ConflictTypeSerializer, ConflictYearlySerializer
+from .tables import TableQueryError
+from .views import EXPORT_CHUNK_SIZE, export_request, export_response, transactional
+
+# How the REST framework's JSONRenderer writes JSON by default.
+API_JSON_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False}
+
+
+def api_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params=API_JSON_PARAMS)
+
+
+def api_login_required(view):
+    """The REST API's IsAuthenticated for async views."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return api_response({'detail': str(NotAuthenticated.default_detail)}, status=403)
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@transactional(timeout=10000)
+@login_required(login_url='app:login')
+@conditional_on_generation()
+async def dashboard_commodity_api(request):
+    """Async views.dashboard_commodity_api."""
+    commodity = request.GET.get('commodity', 'cocoa')
+
+    try:
+        try:
+            validate_commodity_fields([commodity])
+        except InvalidCommodity as e:
+            return JsonResponse({'error': str(e)}, status=400)
+
+        store = await aget_commodity_store()
+        years, series = store.batch_series([commodity])
+
+        if request.GET.get('encoding') == COLUMNAR_ENCODING:
+            data = {
+                'encoding': COLUMNAR_ENCODING,
+                'years': encode_years(years),
+                'prices': series[commodity].tolist(),
+                'commodity_name': commodity.replace('_', ' ').title()
+            }
+            return JsonResponse(data, json_dumps_params={'separators': (',', ':')})
+
+        return JsonResponse({
+            'years': years.tolist(),
+            'prices': series[commodity].tolist(),
+            'commodity_name': commodity.replace('_', ' ').title()
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@transactional(timeout=30000)
+@login_required(login_url='app:login')
+@conditional_on_generation()
+async def dashboard_conflict_api(request):
+    """Async views.dashboard_conflict_api."""
+    try:
+        conflict_stats = await stats.aconflict_stats()
+
+        return JsonResponse({
+            'yearly_data': conflict_stats['yearly_data'],
+            'location_data': conflict_stats['location_data'],
+            'intensity_data': conflict_stats['intensity_data']
+        })
+    except Exception as e:
+        return JsonResponse({'error': str(e)}, status=500)
+
+
+@require_GET
+@read_from_replica
+@api_login_required
+@conditional_on_generation()
+async def conflict_yearly_data_api(request):
+    """Async api_views.ConflictYearlyDataAPI."""
+    conflicts = await stats.ayearly_totals()
+
+    serializer = ConflictYearlySerializer(conflicts, many=True)
+    return api_response({'yearly_data': serializer.data})
+
+
+@require_GET
+@read_from_replica
+@api_login_required
+@conditional_on_generation()
+async def conflict_intensity_api(request):
+    """Async api_views.ConflictIntensityDataApi."""
+    return api_response({'intensity_data': await stats.ayearly_intensity_counts()})
+
+
+@require_GET
+@read_from_replica
+@api_login_required
+@conditional_on_generation()
+async def conflict_types_api(request):
+    """Async api_views.ConflictTypesDataApi."""
+    conflict_types = await stats.atype_counts()
+
+    serializer = ConflictTypeSerializer(conflict_types, many=True)
+    return api_response({'conflict_types': serializer.data})
+
+
+@require_GET
+@read_from_replica
+@api_login_required
+@conditional_on_generation()
+async def conflict_stats_api(request):
+    """Async api_views.ConflictStatsAPI."""
+    return api_response(await stats.aconflict_stats())
+
+
+@require_GET
+@read_from_replica
+@api_login_required
+@conditional_on_generation()
+async def commodity_list_api(request):
+    """Async api_views.CommodityListAPI."""
+    commodity_field = request.GET.get('commodity')
+    if not commodity_field:
+        return api_response({"error": "Missing 'commodity' parameter"}, status=400)
+
+    try:
+        try:
+            validate_commodity_fields([commodity_field])
+        except InvalidCommodity:
+            return api_response({"error": f"Invalid commodity field: {commodity_field}"}, status=400)
+
+        store = await aget_commodity_store()
+        years, series = store.batch_series([commodity_field])
+        prices = series[commodity_field]
+
+        if not len(years):
+            return api_response({"error": "No data found for this commodity."}, status=404)
+
+        commodity_name = commodity_field.replace("_", " ").title()
+
+        if request.GET.get('encoding') == COLUMNAR_ENCODING:
+            return api_response({
+                "encoding": COLUMNAR_ENCODING,
+                "commodity_name": commodity_name,
+                "years": encode_years(years),
+                "prices": prices.tolist()
+            })
+
+        return api_response({
+            "commodity_name": commodity_name,
+            "years": years.tolist(),
+            "prices": prices.tolist()
+        })
+
+    except Exception as e:
+        return api_response({"error": str(e)}, status=500)
+
+
+@require_GET
+@read_from_replica
+@api_login_required
+@conditional_on_generation(year_range=query_year_range('from', 'to'))
+async def commodity_series_api(request):
+    """Async api_views.CommoditySeriesAPI."""
+    names = []
+    for value in request.GET.getlist('commodities'):
+        for name in value.split(','):
+            name = name.strip()
+            if name and name not in names:
+                names.append(name)
+    if not names:
+        return api_response({"error": "Missing 'commodities' parameter"}, status=400)
+
+    try:
+        validate_commodity_fields(names)
+        year_from = request.GET.get('from') or None
+        year_to = request.GET.get('to') or None
+        year_from = int(year_from) if year_from is not None else None
+        year_to = int(year_to) if year_to is not None else None
+    except InvalidCommodity as e:
+        return api_response({"error": str(e)}, status=400)
+    except ValueError:
+        return api_response({"error": "'from' and 'to' must be years"}, status=400)
+
+    store = await aget_commodity_store()
+    years, series = store.batch_series(names, year_from, year_to)
+
+    return api_response({
+        "years": years.tolist(),
+        "series": {
+            name: {
+                "commodity_name": commodity_names.get(name, name.replace("_", " ").title()),
+                "prices": prices_to_list(prices),
+            }
+            for name, prices in series.items()
+        },
+    })
+
+
+@require_GET
+async def correlation_export(request):
+    """
+    Async views.correlation_export. The rows are read with async for, so
+    the ASGI handler streams them as they come instead of collecting a sync
+    iterator in a thread first.
+    """
+    try:
+        query, export_format = export_request(request)
+    except TableQueryError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return export_response(query, export_format, aencode(export_format, query, EXPORT_CHUNK_SIZE))
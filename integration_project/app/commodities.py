@@ -0,0 +1,118 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, FloatField
+
+from .generation import cached_for_generation
+from .models import Commodity
+
+commodity_fields = [
+    ('crude_oil_average_bbl', 'Crude Oil Average'),
+    ('crude_oil_brent_bbl', 'Crude Oil Brent'),
+    ('crude_oil_dubai_bbl', 'Crude Oil Dubai'),
+    ('crude_oil_wti_bbl', 'Crude Oil WTI'),
+    ('coal_australian_mt', 'Coal Australian'),
+    ('coal_south_african_mt', 'Coal South African'),
+    ('natural_gas_us_mmbtu', 'Natural Gas US'),
+    ('natural_gas_europe_mmbtu', 'Natural Gas Europe'),
+    ('liquefied_natural_gas_japan_mmbtu', 'Liquefied Natural Gas Japan'),
+    ('natural_gas_index_2010_100', 'Natural Gas Index (2010=100)'),
+    ('cocoa', 'Cocoa'),
+    ('coffee_arabica_kg', 'Coffee Arabica'),
+    ('coffee_robusta_kg', 'Coffee Robusta'),
+    ('tea_avg_3_auctions_kg', 'Tea Avg 3 Auctions'),
+    ('tea_colombo_kg', 'Tea Colombo'),
+    ('tea_kolkata_kg', 'Tea Kolkata'),
+    ('tea_mombasa_kg', 'Tea Mombasa'),
+    ('coconut_oil_mt', 'Coconut Oil'),
+    ('groundnuts_mt', 'Groundnuts'),
+    ('fish_meal_mt', 'Fish Meal'),
+    ('groundnut_oil_mt', 'Groundnut Oil'),
+    ('palm_oil_mt', 'Palm Oil'),
+    ('palm_kernel_oil_mt', 'Palm Kernel Oil'),
+    ('soybeans_mt', 'Soybeans'),
+    ('soybean_oil_mt', 'Soybean Oil'),
+    ('soybean_meal_mt', 'Soybean Meal'),
+    ('barley_mt', 'Barley'),
+    ('maize_mt', 'Maize'),
+    ('sorghum_mt', 'Sorghum'),
+    ('rice_thai_5_mt', 'Rice Thai 5'),
+    ('rice_thai_25_mt', 'Rice Thai 25'),
+    ('rice_thai_a_1_mt', 'Rice Thai A 1'),
+    ('rice_vietnamese_5_mt', 'Rice Vietnamese 5'),
+    ('wheat_us_srw_mt', 'Wheat US SRW'),
+    ('wheat_us_hrw_mt', 'Wheat US HRW'),
+    ('banana_europe_kg', 'Banana Europe'),
+    ('banana_us_kg', 'Banana US'),
+    ('orange_kg', 'Orange'),
+    ('beef_kg', 'Beef'),
+    ('chicken_kg', 'Chicken'),
+    ('lamb_kg', 'Lamb'),
+    ('shrimps_mexican_kg', 'Shrimps Mexican'),
+    ('sugar_eu_kg', 'Sugar EU'),
+    ('sugar_us_kg', 'Sugar US'),
+    ('sugar_world_kg', 'Sugar World'),
+    ('tobacco_us_import_uv_mt', 'Tobacco US Import UV'),
+    ('logs_cameroon_cubic_meter', 'Logs Cameroon'),
+    ('logs_malaysian_cubic_meter', 'Logs Malaysian'),
+    ('sawnwood_cameroon_cubic_meter', 'Sawnwood Cameroon'),
+    ('sawnwood_malaysian_cubic_meter', 'Sawnwood Malaysian'),
+    ('plywood_sheet', 'Plywood'),
+    ('cotton_a_index_kg', 'Cotton A Index'),
+    ('rubber_tsr20_kg', 'Rubber TSR20'),
+    ('rubber_rss3_kg', 'Rubber RSS3'),
+    ('phosphate_rock_mt', 'Phosphate Rock'),
+    ('dap_mt', 'DAP'),
+    ('tsp_mt', 'TSP'),
+    ('urea_mt', 'Urea'),
+    ('potassium_chloride_mt', 'Potassium Chloride'),
+    ('aluminum_mt', 'Aluminum'),
+    ('iron_ore_cfr_spot_mt', 'Iron Ore CFR Spot'),
+    ('copper_mt', 'Copper'),
+    ('lead_mt', 'Lead'),
+    ('tin_mt', 'Tin'),
+    ('nickel_mt', 'Nickel'),
+    ('zinc_mt', 'Zinc'),
+    ('gold_troy_oz', 'Gold'),
+    ('platinum_troy_oz', 'Platinum'),
+    ('silver_troy_oz', 'Silver')
+]
+
+commodity_names = dict(commodity_fields)
+
+
+class InvalidCommodity(ValueError):
+    """Raised for names that are not commodity price columns."""
+
+
+def validate_commodity_fields(names):
+    """
+    Check that every name is a price column of Commodity according to its
+    model metadata, raising InvalidCommodity for the first one that is not.
+    """
+    for name in names:
+        try:
+            field = Commodity._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise InvalidCommodity(f'Invalid commodity: {name}')
+        if not isinstance(field, FloatField):
+            raise InvalidCommodity(f'Invalid commodity: {name}')
+    return list(names)
+
+
+def _compute_available_commodities():
+    # COUNT(column) skips NULLs, so one SELECT tells which columns have data.
+    counts = Commodity.objects.aggregate(
+        **{field: Count(field) for field, _ in commodity_fields}
+    )
+    return [
+        {'field': field, 'name': name}
+        for field, name in commodity_fields
+        if counts[field]
+    ]
+
+
+def available_commodities():
+    """
+    Commodities with at least one price, as [{'field', 'name'}] in
+    ``commodity_fields`` order. Cached for the current data generation.
+    """
+    return cached_for_generation('available-commodities', _compute_available_commodities)
@@ -0,0 +1,144 @@
+"""
+Commodity dataset for the import engine (see importing).
+
+The header is mapped onto Commodity's fields once per file, failing before
+any row is read if a column doesn't name a field, and each chunk's price
+block is parsed column by column with pandas instead of a float() call per
+cell. Rows are keyed by year, so a corrected price in the source file
+replaces the stored one.
+"""
+import numpy as np
+import pandas as pd
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+
+from .commodity_store import PRICE_FIELDS
+from .importing import DataImportError, Dataset, open_source, run_import
+from .models import Commodity
+
+SOURCE = 'commodities'
+
+_REMOVE = str.maketrans('', '', '($/)¢,')
+_UNDERSCORE = str.maketrans({' ': '_', '=': '_'})
+
+
+class CommodityImportError(DataImportError):
+    """Raised when a commodity file can't be imported."""
+
+
+def plain_header_field(header):
+    """
+    'Crude_oil,_average' -> 'crude_oil_average_bbl'
+
+    Plain headers leave out the unit that ends the field name, so the name is
+    matched against the price field it is the only prefix of.
+    """
+    name = header.strip().lower().replace(',_', '_').replace(' ', '_')
+    if name in PRICE_FIELDS:
+        return name
+    matches = [field for field in PRICE_FIELDS if field.startswith(f'{name}_')]
+    return matches[0] if len(matches) == 1 else name
+
+
+def unit_header_field(header):
+    """'Crude_oil,_average ($/bbl)' -> 'crude_oil_average_bbl'"""
+    return header.lower().translate(_UNDERSCORE).translate(_REMOVE).replace('cocoa_', 'cocoa')
+
+
+def resolve_columns(header, header_field):
+    """
+    Map every CSV column to a Commodity field name using ``header_field``.
+
+    Raises CommodityImportError naming every column that isn't a price field,
+    any field named twice, or a missing year column.
+    """
+    columns = {}
+    unknown = []
+    for name in header:
+        field_name = header_field(name)
+        try:
+            field = Commodity._meta.get_field(field_name)
+        except FieldDoesNotExist:
+            field = None
+        if field is None or not (field.primary_key or isinstance(field, models.FloatField)):
+            unknown.append(name)
+        elif field_name in columns.values():
+            raise CommodityImportError(f'Column {name!r} maps to {field_name}, which is already mapped')
+        else:
+            columns[name] = field_name
+
+    if unknown:
+        raise CommodityImportError(f'Unknown columns: {", ".join(unknown)}')
+    if 'year' not in columns.values():
+        raise CommodityImportError('No year column')
+    return columns
+
+
+class CommodityDataset(Dataset):
+    """
+    Commodity prices, keyed by year. Both the plain and the with-units
+    headers are accepted; the first header style that maps every column wins.
+    """
+
+    name = SOURCE
+    model = Commodity
+    unique_fields = ('year',)
+    header_fields = (unit_header_field, plain_header_field)
+
+    def prepare(self, header):
+        errors = []
+        for header_field in self.header_fields:
+            try:
+                columns = resolve_columns(header, header_field)
+            except CommodityImportError as e:
+                errors.append(e)
+                continue
+            return [columns[name] for name in header]
+        raise errors[0]
+
+    def fields(self, spec):
+        return spec
+
+    def parse_chunk(self, spec, first_position, rows):
+        """
+        Parse a chunk column by column. Empty or non-numeric prices become
+        None; rows without a valid year or with extra cells are rejected.
+        """
+        width = len(spec)
+        rejected = []
+        kept = []
+        positions = []
+        for position, row in enumerate(rows, first_position):
+            if not row:
+                continue
+            if len(row) > width:
+                rejected.append((position, f'expected {width} columns, got {len(row)}'))
+                continue
+            kept.append(row + [''] * (width - len(row)))
+            positions.append(position)
+        if not kept:
+            return [], rejected, 0
+
+        frame = pd.DataFrame(kept, columns=spec, dtype=str)
+        years = pd.to_numeric(frame['year'].str.strip(), errors='coerce')
+        invalid = (years.isna() | (years != years.round())).to_numpy()
+        for index in invalid.nonzero()[0]:
+            rejected.append((positions[index], f'invalid year: {frame["year"].iat[index]!r}'))
+        rejected.sort()
+
+        frame = frame[~invalid].apply(
+            lambda column: pd.to_numeric(column.str.strip(), errors='coerce').astype(np.float64)
+        )
+        frame['year'] = frame['year'].astype(np.int64)
+        # NaN -> None and numpy scalars -> Python ones, so the records hold
+        # what the database will return.
+        frame = frame.astype(object).where(frame.notna(), None)
+        return list(frame.itertuples(index=False, name=None)), rejected, 0
+
+    def delete(self, keys):
+        Commodity.objects.filter(year__in=[int(key) for key in keys]).delete()
+
+
+def import_commodities(path, **options):
+    """Import the commodity file at ``path``; see importing.run_import()."""
+    return run_import(CommodityDataset(), open_source(path), **options)
@@ -0,0 +1,151 @@
+"""
+Process-level columnar copy of the Commodity table.
+
+The table is ~70 float columns by one row per year and only changes when an
+import runs, so it is loaded once per data generation into NumPy arrays: a
+sorted year index plus one float64 array per commodity, with NaN for missing
+prices. Series lookups are served as slices of those arrays instead of
+re-querying and hydrating model instances on every request.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+from asgiref.sync import sync_to_async
+
+from .generation import acurrent_generation, current_generation
+from .models import Commodity
+
+PRICE_FIELDS = [
+    field.name for field in Commodity._meta.concrete_fields if field.name != 'year'
+]
+
+# ?encoding= value selecting the compact time-series layout.
+COLUMNAR_ENCODING = 'columnar'
+
+_store_lock = threading.Lock()
+_store = None
+
+
+class CommodityStore:
+    """
+    Read-only columnar commodity prices for one data generation.
+
+    years: int64 array of years, ascending
+    columns: commodity field name -> float64 array aligned with ``years``
+    """
+
+    def __init__(self, generation, years, prices):
+        self.generation = generation
+        self.years = years
+        # Column-major, so every commodity column is a contiguous view.
+        self._prices = np.asfortranarray(prices)
+        self.columns = {
+            field: self._prices[:, i] for i, field in enumerate(PRICE_FIELDS)
+        }
+        self.years.flags.writeable = False
+        self._prices.flags.writeable = False
+
+    @classmethod
+    def load(cls, generation):
+        rows = list(Commodity.objects.order_by('year').values_list('year', *PRICE_FIELDS))
+        if rows:
+            # NULL -> None -> NaN under the float64 dtype.
+            data = np.array(rows, dtype=np.float64)
+        else:
+            data = np.empty((0, len(PRICE_FIELDS) + 1), dtype=np.float64)
+        return cls(generation, data[:, 0].astype(np.int64), data[:, 1:])
+
+    def __contains__(self, field):
+        return field in self.columns
+
+    def year_slice(self, year_from=None, year_to=None):
+        """Index slice of ``years`` covering the inclusive year range."""
+        start = 0 if year_from is None else int(np.searchsorted(self.years, year_from, 'left'))
+        stop = len(self.years) if year_to is None else int(np.searchsorted(self.years, year_to, 'right'))
+        return slice(start, stop)
+
+    def series(self, field, year_from=None, year_to=None):
+        """
+        ``(years, prices)`` views of one commodity over a year range; missing
+        prices are NaN. Raises KeyError for unknown fields.
+        """
+        window = self.year_slice(year_from, year_to)
+        return self.years[window], self.columns[field][window]
+
+    def batch_series(self, fields, year_from=None, year_to=None):
+        """
+        Aligned series for several commodities over a year range.
+
+        Returns ``(years, {field: prices})`` restricted to the years where at
+        least one of ``fields`` has a price; other gaps are NaN. For a single
+        field this is exactly its observed series.
+        """
+        window = self.year_slice(year_from, year_to)
+        columns = {field: self.columns[field][window] for field in fields}
+        years = self.years[window]
+        if not columns:
+            return years[:0], columns
+
+        observed = np.zeros(len(years), dtype=bool)
+        for prices in columns.values():
+            observed |= ~np.isnan(prices)
+        if observed.all():
+            return years, columns
+        return years[observed], {field: prices[observed] for field, prices in columns.items()}
+
+    def frame(self):
+        """The whole table as a DataFrame with a 'year' column, like .values()."""
+        frame = pd.DataFrame(self._prices, columns=PRICE_FIELDS, copy=False)
+        frame.insert(0, 'year', self.years)
+        return frame
+
+
+def prices_to_list(prices):
+    """Convert a price array to a JSON-ready list, with NaN as None."""
+    return [None if value != value else value for value in prices.tolist()]
+
+
+def encode_years(years):
+    """
+    Compact JSON form of a year axis: ``{'start', 'step', 'count'}`` when the
+    years are evenly spaced (so ``years[i] == start + i * step``), otherwise
+    the plain list.
+    """
+    if len(years) > 1:
+        steps = np.diff(years)
+        if (steps == steps[0]).all():
+            return {'start': int(years[0]), 'step': int(steps[0]), 'count': len(years)}
+        return years.tolist()
+    if len(years) == 1:
+        return {'start': int(years[0]), 'step': 1, 'count': 1}
+    return []
+
+
+def get_commodity_store():
+    """
+    Return the CommodityStore for the current data generation, (re)loading it
+    when an import has bumped the generation since it was last built.
+    """
+    generation = current_generation().generation
+    store = _store
+    if store is not None and store.generation == generation:
+        return store
+    return _reload_store(generation)
+
+
+async def aget_commodity_store():
+    """Async version of get_commodity_store(); a reload runs in a worker thread."""
+    generation = (await acurrent_generation()).generation
+    store = _store
+    if store is not None and store.generation == generation:
+        return store
+    return await sync_to_async(_reload_store)(generation)
+
+
+def _reload_store(generation):
+    global _store
+    with _store_lock:
+        if _store is None or _store.generation != generation:
+            _store = CommodityStore.load(generation)
+        return _store
@@ -0,0 +1,164 @@
+"""
+Conflict dataset for the import engine (see importing).
+
+The CSV header is mapped onto Conflict's fields once per file and rows are
+parsed into plain tuples, in the worker processes when more than one is
+used. Conflict-years are keyed on (conflict_id, year); conflicts in or
+before MIN_YEAR are skipped, and the rollups are refreshed for the years an
+import changed, in the import's transaction.
+"""
+from datetime import date, datetime
+
+from django.db import models
+from django.db.models import Q
+
+from .importing import DataImportError, Dataset, open_source, run_import
+from .models import Conflict
+from .stats import refresh_conflict_stats
+
+# Conflicts in or before this year are skipped.
+MIN_YEAR = 1960
+
+# Tried after ISO 8601, which is what the UCDP files use.
+DATE_FORMATS = ('%m/%d/%Y', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S')
+
+UNIQUE_FIELDS = ['conflict_id', 'year']
+
+class ConflictImportError(DataImportError):
+    """Raised when the file as a whole can't be imported."""
+
+
+def parse_date(value):
+    """Parse a date in any of the accepted formats; None if empty or unparseable."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def column_spec(header):
+    """
+    Map the CSV header onto Conflict's fields, once per file.
+
+    Returns ``[(field name, column index, kind, required, max length)]`` in
+    model field order, where kind is 'int', 'date' or 'text' and the max
+    length is the text column's (None otherwise). Raises ConflictImportError
+    if a field has no column.
+    """
+    positions = {name.strip(): i for i, name in enumerate(header)}
+    spec = []
+    missing = []
+    for field in Conflict._meta.concrete_fields:
+        if field.auto_created:
+            continue
+        if field.name not in positions:
+            missing.append(field.name)
+            continue
+        if isinstance(field, models.DateField):
+            kind = 'date'
+        elif isinstance(field, models.IntegerField):
+            kind = 'int'
+        else:
+            kind = 'text'
+        max_length = field.max_length if kind == 'text' else None
+        spec.append((field.name, positions[field.name], kind, not field.null, max_length))
+    if missing:
+        raise ConflictImportError(f'Missing columns: {", ".join(missing)}')
+    return spec
+
+
+def parse_chunk(spec, first_line, rows):
+    """
+    Parse CSV rows into tuples ordered like ``spec``.
+
+    Returns ``(records, rejected, skipped)``: the parsed records, a list of
+    ``(line number, reason)`` for rows that can't be stored, and the number
+    of rows skipped for being too old. Runs in the worker processes.
+    """
+    width = max(index for _, index, _, _, _ in spec) + 1
+    year_position = next(i for i, (name, _, _, _, _) in enumerate(spec) if name == 'year')
+    records = []
+    rejected = []
+    skipped = 0
+
+    for line, row in enumerate(rows, first_line):
+        if len(row) < width:
+            rejected.append((line, f'expected {width} columns, got {len(row)}'))
+            continue
+
+        record = []
+        error = None
+        for name, index, kind, required, max_length in spec:
+            raw = row[index]
+            if kind == 'int':
+                raw = raw.strip()
+                try:
+                    value = int(raw) if raw else None
+                except ValueError:
+                    error = f'invalid {name}: {raw!r}'
+                    break
+            elif kind == 'date':
+                value = parse_date(raw)
+            else:
+                # Rejected rather than cut short: the COPY path would fail on
+                # it, and bulk_create's array casts would silently truncate it.
+                if max_length is not None and len(raw) > max_length:
+                    error = f'{name} longer than {max_length} characters'
+                    break
+                value = raw if raw or required else None
+            if value is None and required:
+                error = f'missing {name}'
+                break
+            record.append(value)
+
+        if error is not None:
+            rejected.append((line, error))
+        elif record[year_position] <= MIN_YEAR:
+            skipped += 1
+        else:
+            records.append(tuple(record))
+
+    return records, rejected, skipped
+
+
+class ConflictDataset(Dataset):
+    name = 'conflicts'
+    model = Conflict
+    unique_fields = UNIQUE_FIELDS
+
+    def prepare(self, header):
+        return column_spec(header)
+
+    def fields(self, spec):
+        return [name for name, _, _, _, _ in spec]
+
+    def parse_chunk(self, spec, first_position, rows):
+        return parse_chunk(spec, first_position, rows)
+
+    def delete(self, keys):
+        for start in range(0, len(keys), 500):
+            condition = Q()
+            for key in keys[start:start + 500]:
+                conflict_id, year = key.split(':')
+                condition |= Q(conflict_id=int(conflict_id), year=int(year))
+            Conflict.objects.filter(condition).delete()
+
+    def after_write(self, changeset, full):
+        refresh_conflict_stats(None if full else changeset.years)
+
+    def summary(self, result):
+        return f'{result.skipped} from {MIN_YEAR} or earlier skipped'
+
+
+def import_conflicts(path, **options):
+    """Import the conflicts file at ``path``; see importing.run_import()."""
+    return run_import(ConflictDataset(), open_source(path), **options)
@@ -0,0 +1,87 @@
+"""
+PostgreSQL COPY loading for full reloads of the import files.
+
+Rows are streamed with psycopg 3's ``cursor.copy()`` into a temporary staging
+table, one COPY per batch so the connection is free for other queries in
+between, and then merged into the live table with a single
+``INSERT ... ON CONFLICT DO UPDATE``, optionally after deleting the live rows.
+Everything happens in one transaction: readers keep seeing the previous
+contents (DELETE, unlike TRUNCATE, doesn't block them) until it commits.
+"""
+from django.db import DatabaseError, connection, transaction
+from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+try:
+    # Raised as is by cursor.copy(), which Django doesn't wrap.
+    from psycopg import Error as PsycopgError
+except ImportError:
+    PsycopgError = DatabaseError
+
+METHODS = ('insert', 'copy')
+
+
+class CopyNotSupported(RuntimeError):
+    """Raised when the default database can't be loaded with COPY."""
+
+
+def copy_supported():
+    return connection.vendor == 'postgresql' and is_psycopg3
+
+
+def copy_into(model, fields, batches, unique_fields, replace=False):
+    """
+    Load ``batches`` of rows (tuples ordered like ``fields``) into ``model``'s
+    table. The next batch is only taken once the previous one is copied.
+
+    Rows sharing ``unique_fields`` are merged, the last one winning, and
+    upserted over the live rows. With ``replace`` the live table ends up
+    holding exactly the loaded rows. Returns ``(staged, merged)`` row counts.
+    Database errors (a value too long for its column, say) are raised as
+    importing.DataImportError after the load is rolled back.
+    """
+    if not copy_supported():
+        raise CopyNotSupported('COPY loading needs PostgreSQL with psycopg 3')
+
+    qn = connection.ops.quote_name
+    opts = model._meta
+    table = qn(opts.db_table)
+    stage = qn(f'{opts.db_table}_stage')
+    columns = [opts.get_field(name).column for name in fields]
+    key_columns = [opts.get_field(name).column for name in unique_fields]
+    column_list = ', '.join(qn(column) for column in columns)
+    key_list = ', '.join(qn(column) for column in key_columns)
+    updates = ', '.join(
+        f'{qn(column)} = EXCLUDED.{qn(column)}' for column in columns if column not in key_columns
+    )
+
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Same column types as the live table, without its constraints, plus
+            # the load order so later duplicates win.
+            cursor.execute(f'CREATE TEMPORARY TABLE {stage} AS SELECT {column_list} FROM {table} WITH NO DATA')
+            cursor.execute(f'ALTER TABLE {stage} ADD COLUMN _seq bigint GENERATED ALWAYS AS IDENTITY')
+
+            staged = 0
+            for rows in batches:
+                with cursor.copy(f'COPY {stage} ({column_list}) FROM STDIN') as copy:
+                    for row in rows:
+                        copy.write_row(row)
+                        staged += 1
+
+            if replace:
+                cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(
+                f'INSERT INTO {table} ({column_list}) '
+                f'SELECT DISTINCT ON ({key_list}) {column_list} FROM {stage} '
+                f'ORDER BY {key_list}, _seq DESC '
+                f'ON CONFLICT ({key_list}) DO ' + (f'UPDATE SET {updates}' if updates else 'NOTHING')
+            )
+            merged = cursor.rowcount
+            cursor.execute(f'DROP TABLE {stage}')
+    except (DatabaseError, PsycopgError) as e:
+        # importing imports this module.
+        from .importing import DataImportError
+        raise DataImportError(f'Loading {opts.db_table} with COPY failed: {e}') from e
+
+    return staged, merged
+
@@ -0,0 +1,98 @@
+"""
+Streaming encoders for exporting the correlation tables.
+
+encode() takes a TableQuery and yields text chunks, reading rows through
+TableQuery.iter_rows() so neither the query result nor the output document is
+ever held in memory as a whole. aencode() does the same with async for over
+TableQuery.aiter_rows(), for streaming responses served through ASGI.
+"""
+import csv
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+# Rows encoded per chunk handed to the response.
+ROWS_PER_CHUNK = 500
+
+
+class _Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _xml_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return escape(str(value))
+
+
+def csv_format(fields):
+    writer = csv.writer(_Echo())
+    return (
+        writer.writerow(fields),
+        lambda row: writer.writerow(['' if value is None else value for value in row]),
+        '',
+    )
+
+
+def ndjson_format(fields):
+    encoder = DjangoJSONEncoder()
+    return '', lambda row: encoder.encode(dict(zip(fields, row))) + '\n', ''
+
+
+def xml_format(fields):
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<rows>\n',
+        lambda row: '<row>' + ''.join(
+            f'<{name}>{_xml_value(value)}</{name}>' for name, value in zip(fields, row)
+        ) + '</row>\n',
+        '</rows>\n',
+    )
+
+
+def encode(export_format, query, chunk_size):
+    """Yield the export of ``query`` in ``export_format`` as text chunks."""
+    header, line, footer = EXPORT_FORMATS[export_format][0](query.fields)
+    if header:
+        yield header
+    chunk = []
+    for row in query.iter_rows(chunk_size):
+        chunk.append(line(row))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    if footer:
+        yield footer
+
+
+async def aencode(export_format, query, chunk_size):
+    """encode() as an async generator."""
+    header, line, footer = EXPORT_FORMATS[export_format][0](query.fields)
+    if header:
+        yield header
+    chunk = []
+    async for row in query.aiter_rows(chunk_size):
+        chunk.append(line(row))
+        if len(chunk) >= ROWS_PER_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    if footer:
+        yield footer
+
+
+# format -> (formatter, content type, file extension). A formatter takes the
+# field names and returns the document's header, a row -> text function and
+# its footer.
+EXPORT_FORMATS = {
+    'csv': (csv_format, 'text/csv', 'csv'),
+    'ndjson': (ndjson_format, 'application/x-ndjson', 'ndjson'),
+    'xml': (xml_format, 'application/xml', 'xml'),
+}
@@ -0,0 +1,194 @@
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .models import DataGeneration, YearGeneration
+
+# The generation is stored as a single row so every process (web workers and
+# import commands alike) sees the same value.
+GENERATION_PK = 1
+
+# Seconds browsers and proxies may reuse a generation-tagged response
+# without revalidating it.
+DEFAULT_MAX_AGE = 60
+
+
+def current_generation():
+    """
+    Return the DataGeneration row describing the currently loaded data.
+
+    Never writes, so it is safe inside read-only transactions. Before the first
+    import an unsaved row with generation 0 is returned.
+    """
+    row = DataGeneration.objects.filter(pk=GENERATION_PK).first()
+    if row is None:
+        row = DataGeneration(pk=GENERATION_PK, generation=0, updated_at=None)
+    return row
+
+
+async def acurrent_generation():
+    """Async version of current_generation()."""
+    row = await DataGeneration.objects.filter(pk=GENERATION_PK).afirst()
+    if row is None:
+        row = DataGeneration(pk=GENERATION_PK, generation=0, updated_at=None)
+    return row
+
+
+def bump_generation(years=()):
+    """
+    Increment the data generation after an import and return the new value.
+
+    ``years`` are the years whose rows the import changed; they are stamped
+    with the new generation for year-scoped revalidation. Stamping
+    ``updated_at`` pins reads to the primary for a while (see routers).
+    """
+    with transaction.atomic():
+        DataGeneration.objects.get_or_create(pk=GENERATION_PK)
+        DataGeneration.objects.filter(pk=GENERATION_PK).update(
+            generation=F('generation') + 1,
+            updated_at=timezone.now(),
+        )
+        generation = DataGeneration.objects.get(pk=GENERATION_PK).generation
+        YearGeneration.objects.bulk_create(
+            [YearGeneration(year=year, generation=generation) for year in years],
+            update_conflicts=True,
+            unique_fields=['year'],
+            update_fields=['generation'],
+        )
+    return generation
+
+
+def _years(year_from, year_to):
+    years = YearGeneration.objects.all()
+    if year_from is not None:
+        years = years.filter(year__gte=year_from)
+    if year_to is not None:
+        years = years.filter(year__lte=year_to)
+    return years
+
+
+def years_generation(year_from=None, year_to=None):
+    """The latest generation in which any year in the inclusive range changed."""
+    return _years(year_from, year_to).aggregate(generation=Max('generation', default=0))['generation']
+
+
+async def ayears_generation(year_from=None, year_to=None):
+    """Async version of years_generation()."""
+    years = _years(year_from, year_to)
+    return (await years.aaggregate(generation=Max('generation', default=0)))['generation']
+
+
+def query_year_range(from_param, to_param):
+    """
+    For conditional_on_generation(year_range=...): read an inclusive year
+    range from two query parameters. Returns None when neither is given or
+    either isn't a number.
+    """
+    def year_range(request):
+        bounds = [request.GET.get(from_param) or None, request.GET.get(to_param) or None]
+        if bounds == [None, None]:
+            return None
+        try:
+            return tuple(None if bound is None else int(bound) for bound in bounds)
+        except ValueError:
+            return None
+    return year_range
+
+
+def cached_for_generation(key, compute, generation=None):
+    """
+    Return ``compute()``, cached in the process cache for the current data
+    generation. An import bumps the generation, which retires every value
+    cached for the previous one.
+    """
+    if generation is None:
+        generation = current_generation().generation
+    cache_key = f'{key}:{generation}'
+    value = cache.get(cache_key)
+    if value is None:
+        value = compute()
+        cache.set(cache_key, value, timeout=None)
+    return value
+
+
+async def acached_for_generation(key, compute, generation=None):
+    """
+    Async version of cached_for_generation(); ``compute`` is awaited. Shares
+    the cache entries of the sync version.
+    """
+    if generation is None:
+        generation = (await acurrent_generation()).generation
+    cache_key = f'{key}:{generation}'
+    value = await cache.aget(cache_key)
+    if value is None:
+        value = await compute()
+        await cache.aset(cache_key, value, timeout=None)
+    return value
+
+
+def conditional_on_generation(max_age=DEFAULT_MAX_AGE, year_range=None):
+    """
+    View decorator for read-only endpoints whose output only changes when an
+    import runs.
+
+    Tags responses with an ETag and Last-Modified taken from the data
+    generation and answers matching conditional GETs with 304 before the view
+    runs, so only the generation row is read. Successful responses get
+    ``Cache-Control: private, max-age``.
+
+    ``year_range(request)`` may return the ``(year_from, year_to)`` the
+    response is limited to; the ETag then only changes when an import changes
+    one of those years (see years_generation), and no Last-Modified is sent.
+
+    Works on sync and async views alike.
+    """
+    def tag(response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, max_age=max_age)
+        return response
+
+    def validators(row):
+        return f'"data-{row.generation}"', int(row.updated_at.timestamp()) if row.updated_at else None
+
+    def deco(fn):
+        if iscoroutinefunction(fn):
+            @wraps(fn)
+            async def async_wrapper(request, *args, **kwargs):
+                years = year_range(request) if year_range is not None else None
+                if years is not None:
+                    etag, last_modified = f'"years-{await ayears_generation(*years)}"', None
+                else:
+                    etag, last_modified = validators(await acurrent_generation())
+
+                response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+                if response is None:
+                    response = await fn(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                return tag(response, etag, last_modified)
+            return async_wrapper
+
+        @wraps(fn)
+        def wrapper(request, *args, **kwargs):
+            years = year_range(request) if year_range is not None else None
+            if years is not None:
+                etag, last_modified = f'"years-{years_generation(*years)}"', None
+            else:
+                etag, last_modified = validators(current_generation())
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = fn(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            return tag(response, etag, last_modified)
+        return wrapper
+    return deco
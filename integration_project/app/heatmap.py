@@ -0,0 +1,213 @@
+import logging
+import threading
+from io import BytesIO
+
+import pandas as pd
+import seaborn as sns
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.utils import timezone
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
+
+from .commodity_store import get_commodity_store
+from .generation import current_generation
+from .models import CorrelationHeatmap
+from .stats import yearly_intensity_summary
+
+logger = logging.getLogger(__name__)
+
+CONFLICT_COLS = ['total_conflicts', 'avg_intensity', 'total_cumulative_intensity']
+
+KEY_COMMODITY_COLS = [
+    'crude_oil_average_bbl', 'natural_gas_us_mmbtu', 'gold_troy_oz',
+    'copper_mt', 'wheat_us_srw_mt', 'maize_mt', 'cocoa', 'coffee_arabica_kg',
+    'crude_oil_brent_bbl', 'crude_oil_dubai_bbl', 'crude_oil_wti_bbl',
+    'coal_australian_mt', 'coal_south_african_mt', 'natural_gas_europe_mmbtu',
+    'liquefied_natural_gas_japan_mmbtu', 'natural_gas_index_2010_100', 'coffee_robusta_kg',
+    'tea_avg_3_auctions_kg', 'tea_colombo_kg', 'tea_kolkata_kg', 'tea_mombasa_kg',
+    'coconut_oil_mt', 'groundnuts_mt', 'fish_meal_mt', 'groundnut_oil_mt', 'palm_oil_mt',
+    'palm_kernel_oil_mt', 'soybeans_mt', 'soybean_oil_mt', 'soybean_meal_mt', 'barley_mt',
+    'sorghum_mt', 'rice_thai_25_mt', 'rice_thai_a_1_mt', 'rice_vietnamese_5_mt', 'wheat_us_hrw_mt',
+    'banana_europe_kg', 'banana_us_kg', 'orange_kg', 'beef_kg', 'chicken_kg', 'lamb_kg',
+    'shrimps_mexican_kg', 'sugar_eu_kg', 'sugar_us_kg', 'sugar_world_kg', 'tobacco_us_import_uv_mt',
+    'logs_cameroon_cubic_meter', 'logs_malaysian_cubic_meter', 'sawnwood_cameroon_cubic_meter',
+    'sawnwood_malaysian_cubic_meter', 'plywood_sheet', 'cotton_a_index_kg', 'rubber_tsr20_kg',
+    'rubber_rss3_kg', 'phosphate_rock_mt', 'dap_mt', 'tsp_mt', 'urea_mt', 'potassium_chloride_mt',
+    'aluminum_mt', 'iron_ore_cfr_spot_mt', 'lead_mt', 'tin_mt', 'nickel_mt', 'zinc_mt',
+    'platinum_troy_oz', 'silver_troy_oz'
+]
+
+HEATMAP_FORMATS = {
+    'png': 'image/png',
+    'webp': 'image/webp',
+}
+
+# Seconds a client is told to wait while the first heatmap renders.
+HEATMAP_RETRY_AFTER = 30
+
+# One refresh thread per generation, so concurrent cache misses render once.
+_refresh_lock = threading.Lock()
+_refresh_threads = {}
+# Generations whose render failed. Requests don't retry them; the next
+# import (a new generation) or the refresh_heatmap command does.
+_failed_generations = set()
+
+
+def render_correlation_heatmap():
+    """
+    Render the conflicts vs commodity prices correlation heatmap as PNG bytes.
+
+    Uses the object-oriented matplotlib API rather than pyplot, so it can run
+    in a background thread. Until conflicts and commodity prices share a year
+    there is nothing to correlate, and a placeholder image is rendered instead.
+    """
+    commodity_df = get_commodity_store().frame()
+    conflict_df = pd.DataFrame(yearly_intensity_summary())
+    if conflict_df.empty or commodity_df.empty:
+        # An empty summary has no 'year' column to merge on.
+        return render_placeholder_heatmap()
+
+    # Merge datasets on year
+    merged_df = pd.merge(conflict_df, commodity_df, on='year', how='inner')
+    if merged_df.empty:
+        return render_placeholder_heatmap()
+
+    available_commodity_cols = [col for col in KEY_COMMODITY_COLS if col in merged_df.columns]
+    correlation_data = merged_df[CONFLICT_COLS + available_commodity_cols].corr()
+    conflict_commodity_corr = correlation_data.loc[CONFLICT_COLS, available_commodity_cols]
+
+    # Generate heatmap
+    figure = Figure(figsize=(min(2 + len(available_commodity_cols) * 0.5, 40), 10))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    sns.heatmap(
+        conflict_commodity_corr,
+        ax=ax,
+        annot=True,
+        cmap='RdBu_r',
+        center=0,
+        square=False,
+        linewidths=0.5,
+        fmt='.2f',
+        annot_kws={"size": 10}
+    )
+    ax.tick_params(axis='x', labelrotation=45, labelsize=12)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+    ax.tick_params(axis='y', labelsize=12)
+    ax.set_title('Correlation Heatmap: Conflicts vs Commodity Prices', fontsize=18, pad=20)
+    figure.tight_layout()
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', dpi=300, bbox_inches='tight')
+    return buffer.getvalue()
+
+
+def render_placeholder_heatmap():
+    """Render the PNG served while there is no data to correlate."""
+    figure = Figure(figsize=(8, 2))
+    FigureCanvasAgg(figure)
+    figure.text(0.5, 0.5, 'No overlapping conflict and commodity data to correlate yet.',
+                ha='center', va='center', fontsize=12)
+
+    buffer = BytesIO()
+    figure.savefig(buffer, format='png', dpi=100)
+    return buffer.getvalue()
+
+
+def png_to_webp(png):
+    """Losslessly re-encode PNG bytes as WebP, which is noticeably smaller."""
+    buffer = BytesIO()
+    with Image.open(BytesIO(png)) as image:
+        image.save(buffer, format='WEBP', lossless=True)
+    return buffer.getvalue()
+
+
+def refresh_heatmap(generation=None):
+    """
+    Render the heatmap for ``generation`` (default: current) and store it,
+    dropping artifacts of older generations.
+    """
+    if generation is None:
+        generation = current_generation().generation
+
+    png = render_correlation_heatmap()
+    CorrelationHeatmap.objects.update_or_create(
+        generation=generation,
+        defaults={'png': png, 'webp': png_to_webp(png), 'created_at': timezone.now()},
+    )
+    CorrelationHeatmap.objects.filter(generation__lt=generation).delete()
+    with _refresh_lock:
+        _failed_generations.discard(generation)
+    return png
+
+
+def _refresh_in_thread(generation):
+    try:
+        refresh_heatmap(generation)
+    except Exception:
+        logger.exception('Rendering correlation heatmap for generation %s failed', generation)
+        with _refresh_lock:
+            _failed_generations.add(generation)
+    finally:
+        # The thread owns its own connection; don't leak it.
+        connection.close()
+        with _refresh_lock:
+            _refresh_threads.pop(generation, None)
+
+
+def schedule_heatmap_refresh(generation=None):
+    """
+    Refresh the heatmap in a background thread and return that thread.
+
+    If a refresh for the same generation is already running, that thread is
+    returned instead of starting another render.
+    """
+    if generation is None:
+        generation = current_generation().generation
+
+    with _refresh_lock:
+        thread = _refresh_threads.get(generation)
+        if thread is None:
+            thread = threading.Thread(
+                target=_refresh_in_thread,
+                args=(generation,),
+                name=f'heatmap-refresh-{generation}',
+            )
+            _refresh_threads[generation] = thread
+            thread.start()
+    return thread
+
+
+def latest_heatmap():
+    """
+    Return ``(generation, created_at)`` of the heatmap artifact to serve, or
+    None if nothing has been rendered yet.
+
+    The current generation renders in the background; meanwhile a stale
+    artifact is served, and callers never wait for the render. A generation
+    whose render failed is not rendered again on request.
+    """
+    generation = current_generation().generation
+    artifacts = CorrelationHeatmap.objects.values_list('generation', 'created_at')
+    artifact = artifacts.filter(generation__lte=generation).order_by('-generation').first()
+
+    if artifact is None or artifact[0] != generation:
+        with _refresh_lock:
+            failed = generation in _failed_generations
+        if not failed:
+            schedule_heatmap_refresh(generation)
+    return artifact
+
+
+def heatmap_image(generation, image_format='png'):
+    """Return the stored image bytes of ``generation`` in ``image_format``, or None."""
+    if image_format not in HEATMAP_FORMATS:
+        raise ValueError(f'Unsupported heatmap format: {image_format}')
+    images = CorrelationHeatmap.objects.filter(generation=generation).values_list(image_format, flat=True)
+    data = images.first()
+    if data is None:
+        # Possibly rendered a moment ago and not on a read replica yet.
+        data = images.using(DEFAULT_DB_ALIAS).first()
+    return bytes(data) if data is not None else None
@@ -0,0 +1,346 @@
+"""
+Import engine shared by every data file.
+
+An import is a source adapter, which reads a file as a header followed by
+chunks of text rows, and a dataset adapter, which maps the header onto a
+model once and parses chunks into plain tuples. The engine runs the dataset's
+parser over the chunks (in a process pool when more than one worker is used),
+asks the import ledger which rows are new or changed, and upserts those with
+bulk_create or PostgreSQL COPY.
+
+By default the whole import runs in one transaction, so readers see either
+the old data or the new. ``chunked`` commits every batch on its own instead,
+which keeps transactions short for very large files; the ledger and rollups
+are still only updated once every batch is in, so an interrupted chunked
+import is simply redone by the next run. ``dry_run`` does all the work in a
+transaction that is rolled back, to preview the changeset.
+"""
+import csv
+import gzip
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import date
+from itertools import islice
+from pathlib import Path
+
+import django
+from django.db import DatabaseError, transaction
+
+from .copy_load import METHODS, copy_into, copy_supported
+from .ledger import Ledger
+
+# Rejected rows reported individually; the rest are only counted.
+MAX_REPORTED_REJECTS = 10
+
+PARQUET_SUFFIXES = ('.parquet', '.pq')
+
+
+class DataImportError(ValueError):
+    """Raised when a file as a whole can't be imported."""
+
+
+class CSVSource:
+    """A CSV file, gzip-compressed if its name ends in .gz."""
+
+    position = 'line'
+
+    def __init__(self, path):
+        self.path = path
+
+    def open(self):
+        if str(self.path).endswith('.gz'):
+            return gzip.open(self.path, 'rt', encoding='utf-8', newline='')
+        return open(self.path, 'r', encoding='utf-8', newline='')
+
+    def chunks(self, chunk_size):
+        """Yield the header, then ``(first line number, rows)`` chunks."""
+        with self.open() as file:
+            reader = csv.reader(file)
+            try:
+                yield next(reader)
+            except StopIteration:
+                raise DataImportError('The file is empty')
+            line = 2
+            while True:
+                rows = list(islice(reader, chunk_size))
+                if not rows:
+                    return
+                yield line, rows
+                line += len(rows)
+
+
+def _text(value):
+    """A Parquet cell as the text a CSV would hold."""
+    if value is None:
+        return ''
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+class ParquetSource:
+    """
+    A Parquet file, read a row batch at a time. Cells are handed to the
+    dataset as text, like CSV cells, so both go through the same parsers.
+    Needs pyarrow, which is optional.
+    """
+
+    position = 'row'
+
+    def __init__(self, path):
+        self.path = path
+
+    def chunks(self, chunk_size):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise DataImportError('Reading Parquet files needs pyarrow (pip install pyarrow)')
+
+        parquet = pq.ParquetFile(self.path)
+        yield parquet.schema_arrow.names
+        row = 1
+        for batch in parquet.iter_batches(batch_size=chunk_size):
+            columns = [[_text(value) for value in column.to_pylist()] for column in batch.columns]
+            rows = [list(values) for values in zip(*columns)]
+            yield row, rows
+            row += len(rows)
+
+
+def open_source(path):
+    """The source adapter for ``path``, chosen by its suffix."""
+    if Path(path).suffix.lower() in PARQUET_SUFFIXES:
+        return ParquetSource(path)
+    return CSVSource(path)
+
+
+class Dataset:
+    """
+    What the engine needs to know about one kind of file.
+
+    ``name`` is the ledger source and the import_data argument. prepare()
+    maps the header onto the model, raising DataImportError if it can't, and
+    returns a picklable spec; fields() names the positions of the tuples
+    parse_chunk() returns for that spec. parse_chunk() runs in the worker
+    processes and returns ``(records, rejected, skipped)``, rejected being
+    ``(position, reason)`` pairs.
+    """
+
+    name = None
+    model = None
+    unique_fields = ()
+
+    def prepare(self, header):
+        raise NotImplementedError
+
+    def fields(self, spec):
+        raise NotImplementedError
+
+    def parse_chunk(self, spec, first_position, rows):
+        raise NotImplementedError
+
+    def key(self, values):
+        """The ledger key of a row, from its unique field values."""
+        return ':'.join(str(value) for value in values)
+
+    def delete(self, keys):
+        """Delete the rows with these ledger keys."""
+        raise NotImplementedError
+
+    def after_write(self, changeset, full):
+        """Called in the import's transaction once the rows are written."""
+
+    def summary(self, result):
+        """Dataset-specific counts for the command's report."""
+        return ''
+
+
+class ImportResult:
+    """
+    Counts and timing for one import run. ``imported`` counts the distinct
+    rows written; repeats of one in the file are counted in ``duplicates``.
+    ``changeset`` is the ledger's Changeset, or None when the file was
+    unchanged and nothing was read.
+    """
+
+    def __init__(self, dry_run=False):
+        self.read = 0
+        self.imported = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.rejected = []
+        self.rejected_count = 0
+        self.batches = 0
+        self.changeset = None
+        self.dry_run = dry_run
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        elapsed = self.elapsed or time.perf_counter() - self.started
+        return self.read / elapsed if elapsed else 0.0
+
+    def reject(self, rejected):
+        self.rejected_count += len(rejected)
+        self.rejected.extend(rejected[:MAX_REPORTED_REJECTS - len(self.rejected)])
+
+
+def parse_chunks(dataset, spec, chunks, workers):
+    """
+    Parse chunks in order, in ``workers`` processes when more than one. At
+    most two chunks per worker are in flight, so memory stays bounded.
+    """
+    if workers <= 1:
+        for first_position, rows in chunks:
+            yield dataset.parse_chunk(spec, first_position, rows)
+        return
+
+    # django.setup() makes the workers importable under spawn/forkserver too.
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        pending = deque()
+        for first_position, rows in chunks:
+            pending.append(pool.submit(dataset.parse_chunk, spec, first_position, rows))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class _Writer:
+    """Writes the changed records of one import, a batch at a time."""
+
+    def __init__(self, dataset, names, method, result, ledger):
+        model = dataset.model
+        self.dataset = dataset
+        self.ledger = ledger
+        self.model = model
+        self.names = names
+        self.method = method
+        self.result = result
+        self.key_positions = [names.index(name) for name in dataset.unique_fields]
+        self.year_position = names.index('year')
+        # The ledger hashes every stored field, in model order, so the digest
+        # doesn't depend on the column order of the file.
+        self.digest_positions = [
+            names.index(field.name) if field.name in names else None
+            for field in model._meta.concrete_fields if not field.auto_created
+        ]
+
+    def changed(self, records):
+        """Check ``records`` against the ledger; return the changed ones by key."""
+        keys = [self.dataset.key([record[p] for p in self.key_positions]) for record in records]
+        flags = self.ledger.check([
+            (key, record[self.year_position], tuple(None if p is None else record[p] for p in self.digest_positions))
+            for key, record in zip(keys, records)
+        ])
+        self.result.duplicates = self.ledger.duplicates
+        changed = {}
+        for key, record, write in zip(keys, records, flags):
+            # Keyed, so a row is only written once per statement and the last
+            # occurrence in the file wins. An occurrence the ledger doesn't
+            # need written equals the one already pending, if any.
+            if write:
+                changed[key] = record
+        return changed
+
+    def write(self, records):
+        """Upsert ``records``, which must have distinct keys unless copied."""
+        unique_fields = list(self.dataset.unique_fields)
+        if self.method == 'copy':
+            self.copy([records])
+            return
+        instances = [self.model(**dict(zip(self.names, record))) for record in records]
+        self.model.objects.bulk_create(
+            instances,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=[name for name in self.names if name not in unique_fields],
+        )
+        self.result.imported = self.ledger.written
+
+    def copy(self, batches, replace=False):
+        """COPY ``batches`` of records and merge them in one statement; see copy_load."""
+        staged, merged = copy_into(self.model, self.names, batches, list(self.dataset.unique_fields), replace=replace)
+        self.result.imported += merged
+
+
+def run_import(dataset, source, batch_size=1000, workers=1, method='insert', replace=False,
+               full=False, dry_run=False, chunked=False, progress=None):
+    """
+    Import ``source`` into ``dataset``'s model. ``progress`` is called with
+    the ImportResult after every batch. Returns the ImportResult.
+
+    Only rows that are new or changed since the last import (per the import
+    ledger) are written, and nothing is read at all if the file is
+    byte-identical; ``full`` writes every row regardless. With ``replace``,
+    rows missing from the file are deleted as well; with ``full`` too, the
+    table is emptied first.
+
+    method: 'insert' upserts each batch with bulk_create; 'copy' streams the
+    rows through PostgreSQL COPY (see copy_load).
+    """
+    if method not in METHODS:
+        raise DataImportError(f'Unknown method: {method}')
+    if method == 'copy' and not copy_supported():
+        raise DataImportError('The copy method needs PostgreSQL with psycopg 3')
+    if batch_size < 1:
+        raise DataImportError('The batch size must be at least 1')
+    wipe = replace and full
+    if chunked and wipe:
+        # Readers would see the emptied table until the last batch commits.
+        raise DataImportError('A full replace has to run in a single transaction')
+    # A dry run is rolled back as a whole.
+    chunked = chunked and not dry_run
+
+    result = ImportResult(dry_run=dry_run)
+    ledger = Ledger(dataset.name, source.path, full=full)
+    if not full and ledger.file_unchanged():
+        result.elapsed = time.perf_counter() - result.started
+        return result
+
+    chunks = source.chunks(batch_size)
+    spec = dataset.prepare(next(chunks))
+    writer = _Writer(dataset, dataset.fields(spec), method, result, ledger)
+
+    def changed_batches():
+        for records, rejected, skipped in parse_chunks(dataset, spec, chunks, workers):
+            result.read += len(records) + len(rejected) + skipped
+            result.skipped += skipped
+            result.reject(rejected)
+            result.batches += 1
+            yield writer.changed(records)
+            if progress is not None:
+                progress(result)
+
+    try:
+        with ledger, nullcontext() if chunked else transaction.atomic():
+            if method == 'copy' and not chunked:
+                # One staging table and merge for the whole file; DISTINCT ON in
+                # the merge lets the last occurrence of a key win across batches.
+                writer.copy((changed.values() for changed in changed_batches()), replace=wipe)
+            else:
+                if wipe:
+                    dataset.model.objects.all().delete()
+                for changed in changed_batches():
+                    if changed:
+                        with transaction.atomic() if chunked else nullcontext():
+                            writer.write(changed.values())
+
+            with transaction.atomic():
+                if replace and not wipe:
+                    for removed in ledger.removed_keys():
+                        dataset.delete(removed)
+                result.changeset = ledger.finish(removed=replace)
+                dataset.after_write(result.changeset, full)
+
+            if dry_run:
+                transaction.set_rollback(True)
+    except DatabaseError as e:
+        # Constraint violations, values the column can't hold, ... The
+        # transaction (or, chunked, the failed batch) has been rolled back.
+        raise DataImportError(f'Writing {dataset.name} failed in batch {result.batches}: {e}') from e
+
+    result.elapsed = time.perf_counter() - result.started
+    return result
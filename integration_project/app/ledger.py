@@ -0,0 +1,245 @@
+"""
+Import ledger: source file fingerprints and per-row content hashes.
+
+An import first compares the file's SHA-256 with the last import of the same
+source and stops if it is unchanged. Otherwise every parsed row is hashed and
+compared with the digest stored for its natural key, so only new or changed
+rows are written. The resulting Changeset names the affected years, which is
+all downstream invalidation (rollups, year-scoped ETags) needs.
+
+Memory doesn't grow with the file or the table: each batch looks up the
+stored digests of its own keys, and the digests read so far are kept in a
+temporary table that the changeset and the removed keys are computed from in
+SQL.
+"""
+import hashlib
+
+from django.db import connection, transaction
+
+from .models import ImportedFile, RowFingerprint
+
+# Keys per lookup query.
+LOOKUP_CHUNK = 500
+
+
+def file_digest(path):
+    """SHA-256 of the file at ``path``, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def row_digest(values):
+    """Content hash of a parsed row; any change to a stored value changes it."""
+    return hashlib.blake2b(repr(tuple(values)).encode(), digest_size=16).hexdigest()
+
+
+class Changeset:
+    """Counts of the rows created, updated and removed by an import, and their years."""
+
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.removed = 0
+        self.unchanged = 0
+        self.years = set()
+
+    def __bool__(self):
+        return bool(self.created or self.updated or self.removed)
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'removed': self.removed,
+            'unchanged': self.unchanged,
+            'years': sorted(self.years),
+        }
+
+    def __str__(self):
+        summary = (
+            f'{self.created} created, {self.updated} updated, '
+            f'{self.removed} removed, {self.unchanged} unchanged'
+        )
+        if self.years:
+            summary += f' in {len(self.years)} years ({min(self.years)}-{max(self.years)})'
+        return summary
+
+
+class Ledger:
+    """
+    Tracks one import of ``path`` for ``source`` (e.g. 'conflicts').
+
+    Enter it around the import, call check() for every parsed batch and
+    write the rows it flags, then finish(). With ``full`` every row is
+    written, but the changeset is still computed against the previous import.
+    """
+
+    def __init__(self, source, path, full=False):
+        self.source = source
+        self.path = str(path)
+        self.full = full
+        self.sha256 = file_digest(path)
+        # Repeated keys, and distinct keys flagged for writing, so far.
+        self.duplicates = 0
+        self.written = 0
+        qn = connection.ops.quote_name
+        self.table = qn(RowFingerprint._meta.db_table)
+        # key, digest and year of the last occurrence of every key read so
+        # far, and whether any occurrence was written.
+        self.stage = qn(f'{RowFingerprint._meta.db_table}_stage')
+        self.key = qn('key')
+
+    def __enter__(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {self.stage} ({self.key} varchar(64) PRIMARY KEY, '
+                f'digest varchar(32) NOT NULL, year integer NOT NULL, written boolean NOT NULL)'
+            )
+        return self
+
+    def __exit__(self, *exc_info):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.stage}')
+
+    def file_unchanged(self):
+        """True if the last import of this source read an identical file."""
+        latest = ImportedFile.objects.filter(source=self.source).order_by('-imported_at').first()
+        return latest is not None and latest.sha256 == self.sha256
+
+    def check(self, rows):
+        """
+        Record a batch of parsed ``(key, year, values)`` rows, in file order;
+        return for each whether it has to be written.
+
+        A repeated key is compared with its previous occurrence in the file,
+        not with the stored row: once an earlier occurrence has been written,
+        a later one equal to the stored row has to be written back over it.
+        """
+        rows = [(key, year, row_digest(values)) for key, year, values in rows]
+        keys = list({key for key, _, _ in rows})
+        stored = dict(self._lookup(keys))
+        staged = self._staged(keys)
+
+        latest = {}
+        flags = []
+        for key, year, digest in rows:
+            if key in latest or key in staged:
+                self.duplicates += 1
+                previous, _, written = latest.get(key) or staged[key]
+            else:
+                previous, written = stored.get(key), False
+            write = self.full or previous != digest
+            if write and not written:
+                self.written += 1
+            latest[key] = (digest, year, written or write)
+            flags.append(write)
+
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.stage} ({self.key}, digest, year, written) VALUES (%s, %s, %s, %s) '
+                f'ON CONFLICT ({self.key}) DO UPDATE SET '
+                f'digest = excluded.digest, year = excluded.year, written = excluded.written',
+                [(key, digest, year, written) for key, (digest, year, written) in latest.items()],
+            )
+        return flags
+
+    def _lookup(self, keys):
+        """``(key, digest)`` stored for these keys."""
+        for start in range(0, len(keys), LOOKUP_CHUNK):
+            yield from RowFingerprint.objects.filter(
+                source=self.source, key__in=keys[start:start + LOOKUP_CHUNK],
+            ).values_list('key', 'digest')
+
+    def _staged(self, keys):
+        """``{key: (digest, year, written)}`` for the keys already read."""
+        staged = {}
+        with connection.cursor() as cursor:
+            for start in range(0, len(keys), LOOKUP_CHUNK):
+                chunk = keys[start:start + LOOKUP_CHUNK]
+                cursor.execute(
+                    f'SELECT {self.key}, digest, year, written FROM {self.stage} '
+                    f'WHERE {self.key} IN ({", ".join(["%s"] * len(chunk))})',
+                    chunk,
+                )
+                for key, digest, year, written in cursor.fetchall():
+                    staged[key] = (digest, year, bool(written))
+        return staged
+
+    def _missing(self, table='f'):
+        """Condition on the fingerprints of this source whose key wasn't read."""
+        return f'{table}.source = %s AND NOT EXISTS (SELECT 1 FROM {self.stage} s WHERE s.{self.key} = {table}.{self.key})'
+
+    def removed_keys(self):
+        """Yield, a chunk at a time, the keys imported last time that are missing from this file."""
+        last = ''
+        with connection.cursor() as cursor:
+            while True:
+                cursor.execute(
+                    f'SELECT f.{self.key} FROM {self.table} f WHERE {self._missing()} AND f.{self.key} > %s '
+                    f'ORDER BY f.{self.key} LIMIT %s',
+                    [self.source, last, LOOKUP_CHUNK],
+                )
+                keys = [key for key, in cursor.fetchall()]
+                if not keys:
+                    return
+                yield keys
+                last = keys[-1]
+
+    def changeset(self, removed=False):
+        changes = Changeset()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT f.digest IS NULL, f.digest = s.digest, s.year, f.year, COUNT(*) '
+                f'FROM {self.stage} s LEFT JOIN {self.table} f ON f.source = %s AND f.{self.key} = s.{self.key} '
+                f'GROUP BY 1, 2, 3, 4',
+                [self.source],
+            )
+            for created, unchanged, year, previous_year, count in cursor.fetchall():
+                if created:
+                    changes.created += count
+                elif unchanged:
+                    changes.unchanged += count
+                    continue
+                else:
+                    changes.updated += count
+                    # A row can move between years only if the year isn't
+                    # part of its key; invalidate where it was too.
+                    changes.years.add(previous_year)
+                changes.years.add(year)
+            if removed:
+                cursor.execute(
+                    f'SELECT f.year, COUNT(*) FROM {self.table} f WHERE {self._missing()} GROUP BY f.year',
+                    [self.source],
+                )
+                for year, count in cursor.fetchall():
+                    changes.removed += count
+                    changes.years.add(year)
+        return changes
+
+    def finish(self, removed=False):
+        """
+        Store the new fingerprints and the file record; ``removed`` says the
+        caller deleted the rows of removed_keys(). Returns the Changeset.
+        """
+        changes = self.changeset(removed)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (source, {self.key}, digest, year) '
+                f'SELECT %s, s.{self.key}, s.digest, s.year '
+                f'FROM {self.stage} s LEFT JOIN {self.table} f ON f.source = %s AND f.{self.key} = s.{self.key} '
+                f'WHERE f.digest IS NULL OR f.digest <> s.digest '
+                f'ON CONFLICT (source, {self.key}) DO UPDATE SET digest = excluded.digest, year = excluded.year',
+                [self.source, self.source],
+            )
+            if changes.removed:
+                cursor.execute(f'DELETE FROM {self.table} WHERE {self._missing(self.table)}', [self.source])
+            ImportedFile.objects.create(
+                source=self.source,
+                path=self.path,
+                sha256=self.sha256,
+                changeset=changes.as_dict(),
+            )
+        return changes
@@ -0,0 +1,234 @@
+"""
+HTTP load driver for a running deployment (see the load_test command).
+
+Logs in through the login form like a browser, then requests every named
+URL in app/urls.py in turn: one warm-up request, then ``requests`` more from
+``concurrency`` threads. The report is a
+JSON-ready dict with latency percentiles and throughput per endpoint,
+rounded and sorted so reports from two releases diff cleanly.
+
+Every request opens a new connection unless keep_alive is set. Servers
+that write the headers and body of a response separately without
+TCP_NODELAY (runserver among them) stall reused connections for a delayed
+ACK, around 40 ms a request, which would swamp what is being measured.
+"""
+import http.client
+import math
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+from django.conf import settings
+from django.urls import NoReverseMatch, reverse
+
+from . import urls
+
+# Query parameters for the URLs that need them to do representative work.
+ENDPOINT_PARAMS = {
+    'dashboard_commodity_api': {'commodity': 'cocoa'},
+    'correlations': {'table': 'conflicts'},
+    'correlation_rows': {'table': 'conflicts'},
+    'correlation_export': {'table': 'commodities', 'format': 'csv'},
+    'commodity-list': {'commodity': 'gold_troy_oz', 'encoding': 'columnar'},
+    'commodity-series': {'commodities': 'cocoa,gold_troy_oz,copper_mt', 'from': '1990', 'to': '2020'},
+}
+
+# Logging out would end the session the other requests use.
+SKIPPED = {'logout'}
+
+REPORT_VERSION = 1
+
+
+class LoadTestError(Exception):
+    """Raised when the target can't be load tested (unreachable, login refused)."""
+
+
+def endpoints():
+    """``[(name, path)]`` for every named URL in app/urls.py that can be requested as is."""
+    found = []
+    for pattern in urls.urlpatterns:
+        if not pattern.name or pattern.name in SKIPPED:
+            continue
+        try:
+            path = reverse(f'{urls.app_name}:{pattern.name}')
+        except NoReverseMatch:
+            # Takes URL arguments.
+            continue
+        params = ENDPOINT_PARAMS.get(pattern.name)
+        found.append((pattern.name, f'{path}?{urlencode(params)}' if params else path))
+    return found
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of a non-empty ascending list."""
+    return sorted_values[max(0, math.ceil(fraction * len(sorted_values)) - 1)]
+
+
+class Session:
+    """Cookies shared by the driver's connections, starting with the login."""
+
+    def __init__(self, base_url, timeout, keep_alive=False):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https'):
+            raise LoadTestError(f'Unsupported URL: {base_url}')
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.scheme = parts.scheme
+        self.netloc = parts.netloc
+        self.prefix = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.keep_alive = keep_alive
+        self.cookies = SimpleCookie()
+        self.cookies_lock = threading.Lock()
+
+    def connect(self):
+        return self.connection_class(self.netloc, timeout=self.timeout)
+
+    def request(self, connection, method, path, body=None, headers=None):
+        """Send one request on ``connection`` and read the whole response: ``(status, headers, body)``."""
+        headers = {'Accept-Encoding': 'gzip', **(headers or {})}
+        if not self.keep_alive:
+            headers['Connection'] = 'close'
+        cookie = '; '.join(f'{name}={morsel.value}' for name, morsel in self.cookies.items())
+        if cookie:
+            headers['Cookie'] = cookie
+        for attempt in range(2):
+            try:
+                connection.request(method, self.prefix + path, body=body, headers=headers)
+                response = connection.getresponse()
+                data = response.read()
+                if not self.keep_alive:
+                    # Reopened by the next request.
+                    connection.close()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed the keep-alive connection; reconnect once.
+                connection.close()
+                if attempt:
+                    raise
+        with self.cookies_lock:
+            for value in response.headers.get_all('Set-Cookie') or ():
+                self.cookies.load(value)
+        return response.status, response.headers, data
+
+    def login(self, username, password):
+        connection = self.connect()
+        login_path = reverse('app:login')
+        try:
+            self.request(connection, 'GET', login_path)
+            csrf_token = self.cookies.get(settings.CSRF_COOKIE_NAME)
+            form = urlencode({
+                'username': username,
+                'password': password,
+                'csrfmiddlewaretoken': csrf_token.value if csrf_token else '',
+            })
+            status, _, _ = self.request(connection, 'POST', login_path, body=form, headers={
+                'Content-Type': 'application/x-www-form-urlencoded',
+                'Referer': f'{self.scheme}://{self.netloc}{self.prefix}{login_path}',
+            })
+        except (OSError, http.client.HTTPException) as e:
+            raise LoadTestError(f'Cannot reach {self.netloc}: {e}')
+        finally:
+            connection.close()
+        # The login view redirects to the dashboard only on success.
+        if status != 302 or settings.SESSION_COOKIE_NAME not in self.cookies:
+            raise LoadTestError(f'Login as {username!r} failed (status {status})')
+
+
+def run_load_test(base_url, username, password, requests=100, concurrency=8, timeout=30, keep_alive=False,
+                  only=None, progress=None):
+    """
+    Load test the deployment at ``base_url`` and return the report.
+
+    ``only`` limits the run to these URL names; ``progress(name, result)`` is
+    called after each endpoint.
+    """
+    session = Session(base_url, timeout, keep_alive)
+    session.login(username, password)
+
+    local = threading.local()
+    connections = []
+
+    def fetch(path):
+        if not hasattr(local, 'connection'):
+            local.connection = session.connect()
+            connections.append(local.connection)
+        started = time.perf_counter()
+        try:
+            status, _, data = session.request(local.connection, 'GET', path)
+        except (OSError, http.client.HTTPException):
+            local.connection.close()
+            status, data = None, b''
+        return (time.perf_counter() - started) * 1000, status, len(data)
+
+    results = {}
+    started_at = datetime.now(timezone.utc)
+    with ThreadPoolExecutor(concurrency) as pool:
+        for name, path in endpoints():
+            if only and name not in only:
+                continue
+            fetch(path)
+            started = time.perf_counter()
+            samples = list(pool.map(fetch, [path] * requests))
+            wall = time.perf_counter() - started
+            results[name] = summarize(path, samples, wall)
+            if progress:
+                progress(name, results[name])
+    for connection in connections:
+        connection.close()
+
+    return {
+        'version': REPORT_VERSION,
+        'base_url': base_url,
+        'started': started_at.isoformat(timespec='seconds'),
+        'requests_per_endpoint': requests,
+        'concurrency': concurrency,
+        'keep_alive': keep_alive,
+        'endpoints': results,
+    }
+
+
+def summarize(path, samples, wall):
+    """One endpoint's report entry from ``(milliseconds, status, bytes)`` samples."""
+    timings = sorted(ms for ms, _, _ in samples)
+    statuses = {}
+    for _, status, _ in samples:
+        key = str(status) if status is not None else 'error'
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        'path': path,
+        'requests': len(samples),
+        'errors': sum(status is None or status >= 400 for _, status, _ in samples),
+        'statuses': dict(sorted(statuses.items())),
+        'throughput_rps': round(len(samples) / wall, 1),
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'p50_ms': round(percentile(timings, 0.50), 2),
+        'p95_ms': round(percentile(timings, 0.95), 2),
+        'p99_ms': round(percentile(timings, 0.99), 2),
+        'max_ms': round(timings[-1], 2),
+        'mean_bytes': round(statistics.fmean(size for _, _, size in samples)),
+    }
+
+
+def compare_reports(baseline, report, metrics=('p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps')):
+    """
+    ``{name: {metric: (baseline, current, relative change)}}`` for the
+    endpoints in both reports.
+    """
+    changes = {}
+    for name, current in report['endpoints'].items():
+        previous = baseline['endpoints'].get(name)
+        if previous is None:
+            continue
+        changes[name] = {
+            metric: (
+                previous[metric],
+                current[metric],
+                (current[metric] - previous[metric]) / previous[metric] if previous[metric] else None,
+            )
+            for metric in metrics
+        }
+    return changes
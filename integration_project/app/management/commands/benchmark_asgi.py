@@ -0,0 +1,174 @@
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+# The JSON chart endpoints, requested round robin.
+ENDPOINTS = [
+    ('app:dashboard_commodity_api', 'commodity=cocoa'),
+    ('app:dashboard_conflict_api', ''),
+    ('app:conflict_data_api', ''),
+    ('app:conflict-intensity-api', ''),
+    ('app:conflict-type-api', ''),
+    ('app:conflict-stats-api', ''),
+    ('app:commodity-list', 'commodity=gold_troy_oz&encoding=columnar'),
+    ('app:commodity-series', 'commodities=cocoa,gold_troy_oz&from=1990&to=2020'),
+]
+
+HOST = 'localhost'
+
+
+class Command(BaseCommand):
+    help = ('Compare chart endpoint throughput under WSGI (sync views, one thread per request in '
+            'flight) and ASGI (async views on one event loop), with both handlers driven in-process')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=800, help='Requests per mode')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight')
+        parser.add_argument('--user', help='Username to send the requests as (default: the first user)')
+
+    def handle(self, *args, **options):
+        requests, concurrency = options['requests'], options['concurrency']
+        if requests < 1 or concurrency < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+
+        users = get_user_model().objects.order_by('pk')
+        if options['user']:
+            users = users.filter(username=options['user'])
+        user = users.first()
+        if user is None:
+            raise CommandError('No user to send the requests as; create one first')
+
+        paths = [f'{reverse(name)}?{query}' if query else reverse(name) for name, query in ENDPOINTS]
+        paths = [paths[i % len(paths)] for i in range(requests)]
+
+        session = self.login(user)
+        cookie = f'{settings.SESSION_COOKIE_NAME}={session.session_key}'
+        try:
+            results = {
+                f'WSGI, {concurrency} threads': self.run_wsgi(paths, concurrency, cookie),
+                'ASGI, 1 event loop': asyncio.run(self.run_asgi(paths, concurrency, cookie)),
+            }
+        finally:
+            session.delete()
+
+        self.stdout.write(
+            f'{requests} requests per mode over {len(ENDPOINTS)} endpoints, {concurrency} in flight'
+        )
+        for name, (wall, timings, statuses) in results.items():
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            line = (f'{name:>20}: {len(timings) / wall:8.1f} requests/s, '
+                    f'median {statistics.median(timings):7.2f} ms, p95 {p95:7.2f} ms')
+            failed = sum(status != 200 for status in statuses)
+            if failed:
+                line += f', {failed} not 200'
+            self.stdout.write(line)
+
+    def login(self, user):
+        """A saved session logged in as ``user``, like the login view creates."""
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+        session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session
+
+    def run_wsgi(self, paths, concurrency, cookie):
+        """Serve ``paths`` through the WSGI handler from ``concurrency`` threads."""
+        handler = WSGIHandler()
+
+        def request(path):
+            path, _, query = path.partition('?')
+            environ = {
+                'REQUEST_METHOD': 'GET',
+                'SCRIPT_NAME': '',
+                'PATH_INFO': path,
+                'QUERY_STRING': query,
+                'SERVER_NAME': HOST,
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'HTTP_HOST': HOST,
+                'HTTP_COOKIE': cookie,
+                'wsgi.input': BytesIO(),
+                'wsgi.errors': sys.stderr,
+                'wsgi.url_scheme': 'http',
+            }
+            started = time.perf_counter()
+            response = handler(environ, lambda status, headers: None)
+            b''.join(response)
+            # Sends request_finished, which hands the connection back.
+            response.close()
+            return (time.perf_counter() - started) * 1000, response.status_code
+
+        with ThreadPoolExecutor(concurrency) as pool:
+            # Warm up: open connections, fill the caches.
+            list(pool.map(request, paths[:concurrency]))
+            started = time.perf_counter()
+            results = list(pool.map(request, paths))
+            wall = time.perf_counter() - started
+        timings, statuses = zip(*results)
+        return wall, timings, statuses
+
+    async def run_asgi(self, paths, concurrency, cookie):
+        """Serve ``paths`` through the ASGI handler, ``concurrency`` at a time."""
+        handler = ASGIHandler()
+        in_flight = asyncio.Semaphore(concurrency)
+
+        async def request(path):
+            path, _, query = path.partition('?')
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'GET',
+                'scheme': 'http',
+                'path': path,
+                'raw_path': path.encode(),
+                'query_string': query.encode(),
+                'root_path': '',
+                'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0),
+                'server': (HOST, 80),
+            }
+            body_sent = False
+            finished = asyncio.Event()
+            status = None
+
+            async def receive():
+                nonlocal body_sent
+                if not body_sent:
+                    body_sent = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                # The handler listens for the client going away until the
+                # response is sent.
+                await finished.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                nonlocal status
+                if message['type'] == 'http.response.start':
+                    status = message['status']
+
+            async with in_flight:
+                started = time.perf_counter()
+                await handler(scope, receive, send)
+                elapsed = (time.perf_counter() - started) * 1000
+            finished.set()
+            return elapsed, status
+
+        await asyncio.gather(*(request(path) for path in paths[:concurrency]))
+        started = time.perf_counter()
+        results = await asyncio.gather(*(request(path) for path in paths))
+        wall = time.perf_counter() - started
+        timings, statuses = zip(*results)
+        return wall, timings, statuses
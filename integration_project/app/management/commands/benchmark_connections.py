@@ -0,0 +1,89 @@
+import copy
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.utils import load_backend
+from app.views import transactional
+
+
+@transactional(timeout=10000)
+def _request():
+    """What a transactional view does before its own queries, plus one."""
+    with connection.cursor() as cur:
+        cur.execute("SELECT 1")
+        cur.fetchone()
+
+
+class Command(BaseCommand):
+    help = ('Measure per-request database overhead with a new connection per request, '
+            'persistent connections (CONN_MAX_AGE) and the connection pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        if requests < 1:
+            raise CommandError('--requests must be at least 1')
+
+        configured = connections[DEFAULT_DB_ALIAS].settings_dict
+        if configured['ENGINE'] != 'django.db.backends.postgresql':
+            raise CommandError('The benchmark needs the PostgreSQL backend')
+
+        modes = [
+            ('new connection', {'CONN_MAX_AGE': 0}, False),
+            ('CONN_MAX_AGE', {'CONN_MAX_AGE': 60}, False),
+            ('pool', {'CONN_MAX_AGE': 0}, True),
+        ]
+        results = {}
+        for name, overrides, pooled in modes:
+            settings_dict = copy.deepcopy(configured)
+            settings_dict.update(overrides)
+            options_dict = settings_dict.setdefault('OPTIONS', {})
+            pool = options_dict.pop('pool', None)
+            if pooled:
+                options_dict['pool'] = pool or True
+            results[name] = self.run(settings_dict, requests)
+
+        baseline = statistics.median(results['new connection'])
+        self.stdout.write(f'{requests} requests per mode (SET TRANSACTION ..., SELECT 1, COMMIT)')
+        for name, timings in results.items():
+            median = statistics.median(timings)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            line = f'{name:>15}: median {median:6.2f} ms, p95 {p95:6.2f} ms'
+            if name != 'new connection':
+                line += f', {baseline - median:+.2f} ms saved per request'
+            self.stdout.write(line)
+
+    def run(self, settings_dict, requests):
+        """Time ``requests`` request cycles on a connection built from ``settings_dict``."""
+        backend = load_backend(settings_dict['ENGINE'])
+        wrapper = backend.DatabaseWrapper(settings_dict, DEFAULT_DB_ALIAS)
+        original = connections[DEFAULT_DB_ALIAS]
+        connections[DEFAULT_DB_ALIAS] = wrapper
+        timings = []
+        try:
+            # Warm up: open the pool or the persistent connection once.
+            self.cycle()
+            for _ in range(requests):
+                started = time.perf_counter()
+                self.cycle()
+                timings.append((time.perf_counter() - started) * 1000)
+        finally:
+            wrapper.close()
+            if settings_dict['OPTIONS'].get('pool'):
+                wrapper.close_pool()
+            connections[DEFAULT_DB_ALIAS] = original
+        return timings
+
+    def cycle(self):
+        # The signals Django sends around every request; request_finished
+        # closes (or returns to the pool) connections past CONN_MAX_AGE.
+        request_started.send(sender=self.__class__)
+        try:
+            _request()
+        finally:
+            request_finished.send(sender=self.__class__)
@@ -0,0 +1,70 @@
+import os
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from app.copy_load import copy_supported
+from app.synthetic import (
+    COMMODITY_FIELDS, CONFLICT_FIELDS, FIRST_YEAR, LAST_YEAR, commodity_rows, conflict_rows, write_csv,
+)
+
+
+class Command(BaseCommand):
+    help = ('Generate synthetic conflict-years and yearly commodity prices for load testing, '
+            'and import them like real data files')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conflict-years', type=int, default=10_000,
+                            help='Conflict rows to generate (one per conflict and year)')
+        parser.add_argument('--first-year', type=int, default=FIRST_YEAR)
+        parser.add_argument('--last-year', type=int, default=LAST_YEAR)
+        parser.add_argument('--seed', type=int, default=0, help='The same seed generates the same data')
+        parser.add_argument('--output', help='Keep the generated files in this directory')
+        parser.add_argument('--no-import', action='store_true', help='Only write the files (needs --output)')
+        parser.add_argument('--replace', action='store_true',
+                            help='Delete the rows the generated files do not contain')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Processes parsing chunks in parallel during the import')
+
+    def handle(self, *args, **options):
+        count = options['conflict_years']
+        first_year, last_year = options['first_year'], options['last_year']
+        if count < 1:
+            raise CommandError('--conflict-years must be at least 1')
+        if last_year < first_year:
+            raise CommandError('--last-year is before --first-year')
+        if options['no_import'] and not options['output']:
+            raise CommandError('--no-import needs --output')
+
+        if options['output']:
+            os.makedirs(options['output'], exist_ok=True)
+            self.generate(options['output'], count, first_year, last_year, options)
+        else:
+            with tempfile.TemporaryDirectory() as directory:
+                self.generate(directory, count, first_year, last_year, options)
+
+    def generate(self, directory, count, first_year, last_year, options):
+        seed = options['seed']
+        conflicts = os.path.join(directory, 'conflicts.csv.gz')
+        commodities = os.path.join(directory, 'commodities.csv')
+
+        write_csv(conflicts, CONFLICT_FIELDS, conflict_rows(count, first_year, last_year, seed))
+        years = write_csv(commodities, COMMODITY_FIELDS, commodity_rows(first_year, last_year, seed))
+        self.stdout.write(f'Wrote {count} conflict-years to {conflicts} and {years} years of prices to {commodities}')
+        if options['no_import']:
+            return
+
+        import_options = {
+            'workers': options['workers'],
+            'replace': options['replace'],
+            'stdout': self.stdout,
+            'stderr': self.stderr,
+            'verbosity': options['verbosity'],
+        }
+        call_command('import_data', 'commodities', commodities, **import_options)
+        call_command(
+            'import_data', 'conflicts', conflicts,
+            method='copy' if copy_supported() else 'insert',
+            batch_size=10_000,
+            **import_options,
+        )
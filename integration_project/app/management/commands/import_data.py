@@ -0,0 +1,103 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from app.commodity_import import CommodityDataset
+from app.conflict_import import ConflictDataset
+from app.copy_load import METHODS
+from app.generation import bump_generation
+from app.heatmap import schedule_heatmap_refresh
+from app.importing import DataImportError, open_source, run_import
+
+DATASETS = {
+    'commodities': CommodityDataset,
+    'conflicts': ConflictDataset,
+}
+
+
+class Command(BaseCommand):
+    help = 'Import a data file (CSV, gzipped CSV or Parquet) into one of the datasets'
+
+    # Set by the single-dataset aliases (import_conflicts, ...).
+    dataset = None
+
+    def add_arguments(self, parser):
+        if self.dataset is None:
+            parser.add_argument('dataset', choices=sorted(DATASETS), help='What the file holds')
+        parser.add_argument('path', type=str,
+                            help='Path to the file; .gz is read as gzipped CSV, .parquet as Parquet')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows per parsed chunk and upsert statement')
+        parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1),
+                            help='Processes parsing chunks in parallel (1 parses inline)')
+        parser.add_argument('--method', choices=METHODS, default='insert',
+                            help='insert: batched upserts; copy: PostgreSQL COPY through a staging table')
+        parser.add_argument('--replace', action='store_true',
+                            help='Also delete rows missing from the file')
+        parser.add_argument('--full', action='store_true',
+                            help='Write every row, even if the import ledger says it is unchanged')
+        parser.add_argument('--chunked', action='store_true',
+                            help='Commit every batch separately instead of one transaction for the file')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Parse and compare with the database, then roll everything back')
+
+    def handle(self, *args, **options):
+        dataset = DATASETS[self.dataset or options['dataset']]()
+        path = options['path']
+        source = open_source(path)
+
+        def progress(result):
+            self.stdout.write(
+                f'Batch {result.batches}: {result.read} rows read, {result.imported} written '
+                f'({result.rows_per_second:,.0f} rows/s)'
+            )
+
+        try:
+            result = run_import(
+                dataset,
+                source,
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+                progress=progress if options['verbosity'] > 1 else None,
+                method=options['method'],
+                replace=options['replace'],
+                full=options['full'],
+                dry_run=options['dry_run'],
+                chunked=options['chunked'],
+            )
+        except FileNotFoundError:
+            raise CommandError(f'File "{path}" not found.')
+        except DataImportError as e:
+            raise CommandError(f'Error importing data: {e}')
+
+        if result.changeset is None:
+            self.stdout.write(self.style.SUCCESS(f'{path} is unchanged since the last import; nothing to do.'))
+            return
+
+        counts = [f'{result.read} rows read', f'{result.duplicates} duplicates']
+        if dataset.summary(result):
+            counts.append(dataset.summary(result))
+        counts.append(f'{result.rejected_count} rejected')
+        verb = 'Would import' if result.dry_run else 'Successfully imported'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {result.imported} {dataset.name} ({", ".join(counts)}) '
+                f'in {result.elapsed:.2f}s ({result.rows_per_second:,.0f} rows/s)'
+            )
+        )
+        if result.rejected_count:
+            for position, reason in result.rejected:
+                self.stderr.write(self.style.WARNING(f'Rejected {source.position} {position}: {reason}'))
+            hidden = result.rejected_count - len(result.rejected)
+            if hidden:
+                self.stderr.write(self.style.WARNING(f'... and {hidden} more rejected rows'))
+
+        self.stdout.write(f'Changes: {result.changeset}')
+        if result.dry_run:
+            self.stdout.write('Dry run; nothing was saved.')
+            return
+        if not result.changeset:
+            return
+
+        generation = bump_generation(result.changeset.years)
+        self.stdout.write(f'Refreshing correlation heatmap for data generation {generation} in the background...')
+        schedule_heatmap_refresh(generation)
@@ -0,0 +1,83 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from app.loadtest import LoadTestError, compare_reports, endpoints, run_load_test
+
+
+class Command(BaseCommand):
+    help = ('Log in to a running deployment and request every URL of the app at a given '
+            'concurrency, reporting latency percentiles and throughput per endpoint as JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', nargs='?', default='http://localhost:8000',
+                            help='Where the deployment is served')
+        parser.add_argument('--username', required=True)
+        parser.add_argument('--password', default=os.environ.get('LOAD_TEST_PASSWORD'),
+                            help='Defaults to the LOAD_TEST_PASSWORD environment variable')
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint')
+        parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight')
+        parser.add_argument('--timeout', type=float, default=30, help='Seconds to wait for a response')
+        parser.add_argument('--keep-alive', action='store_true',
+                            help='Reuse connections (skews latencies on servers like runserver, see app/loadtest.py)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', metavar='URL_NAME',
+                            help='Only test this URL name; may be repeated')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+        parser.add_argument('--compare', metavar='REPORT',
+                            help='A previous report to compare latencies and throughput with')
+
+    def handle(self, *args, **options):
+        if options['password'] is None:
+            raise CommandError('Pass --password or set LOAD_TEST_PASSWORD')
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests and --concurrency must be at least 1')
+        names = {name for name, _ in endpoints()}
+        unknown = set(options['endpoints'] or ()) - names
+        if unknown:
+            raise CommandError(f'Unknown URL names: {", ".join(sorted(unknown))}')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read {options["compare"]}: {e}')
+
+        def progress(name, result):
+            self.stderr.write(
+                f'{name:>26}: {result["throughput_rps"]:8.1f} req/s, p50 {result["p50_ms"]:8.2f} ms, '
+                f'p95 {result["p95_ms"]:8.2f} ms, p99 {result["p99_ms"]:8.2f} ms'
+                + (f', {result["errors"]} errors' if result['errors'] else '')
+            )
+
+        try:
+            report = run_load_test(
+                options['base_url'],
+                options['username'],
+                options['password'],
+                requests=options['requests'],
+                concurrency=options['concurrency'],
+                timeout=options['timeout'],
+                keep_alive=options['keep_alive'],
+                only=options['endpoints'],
+                progress=progress if options['verbosity'] else None,
+            )
+        except LoadTestError as e:
+            raise CommandError(str(e))
+
+        if baseline is not None:
+            for name, metrics in compare_reports(baseline, report).items():
+                changes = ', '.join(
+                    f'{metric} {old} -> {new}' + (f' ({change:+.0%})' if change is not None else '')
+                    for metric, (old, new, change) in metrics.items()
+                )
+                self.stderr.write(f'{name:>26}: {changes}')
+
+        text = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(text + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(text)
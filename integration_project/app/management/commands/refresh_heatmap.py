@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app.generation import current_generation
+from app.heatmap import refresh_heatmap
+
+
+class Command(BaseCommand):
+    help = 'Render the correlation heatmap for the current data generation and cache it'
+
+    def handle(self, *args, **options):
+        generation = current_generation().generation
+        png = refresh_heatmap(generation)
+        self.stdout.write(
+            self.style.SUCCESS(f'Cached correlation heatmap for data generation {generation} ({len(png)} bytes)')
+        )
@@ -0,0 +1,102 @@
+"""
+Response compression for the JSON APIs and HTML pages, and the switch to
+the async views for requests served through ASGI.
+
+Brotli (the ``brotli`` package) is used for API responses (JSON, NDJSON,
+XML) when the client accepts it; everything else, and everything when the
+package is missing, goes through Django's gzip handling. HTML pages in
+particular stay on gzip: they can carry CSRF tokens, and GZipMiddleware pads
+them with random-length filler against BREACH, which Brotli has no
+equivalent of. Small bodies and content types that are already compressed
+(images, the heatmap PNG/WebP) are passed through untouched.
+"""
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/xml',
+    'application/javascript',
+)
+
+# API payloads, which echo no secrets next to request-controlled data.
+BROTLI_TYPES = (
+    'application/json',
+    'application/x-ndjson',
+    'application/xml',
+)
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    GZipMiddleware with a configurable size threshold
+    (``COMPRESSION_MIN_LENGTH``, bytes), a content-type allow list and Brotli
+    for non-streaming API responses when available.
+    """
+
+    def process_response(self, request, response):
+        content_type = response.get('Content-Type', '')
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        min_length = getattr(settings, 'COMPRESSION_MIN_LENGTH', 1024)
+        if not response.streaming and len(response.content) < min_length:
+            return response
+
+        accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if (
+            brotli is None
+            or not content_type.startswith(BROTLI_TYPES)
+            or response.streaming
+            or response.has_header('Content-Encoding')
+            or not re_accepts_brotli.search(accept_encoding)
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli.compress(response.content, quality=5)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(response.content))
+
+        # Same as GZipMiddleware: the body changed, so a strong ETag no
+        # longer identifies it byte for byte.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+# Root URLconf for requests handled asynchronously.
+ASYNC_URLCONF = 'integration_project.asgi_urls'
+
+
+@sync_and_async_middleware
+def async_views_middleware(get_response):
+    """
+    Serve the JSON chart endpoints and the correlation export with the
+    async views (app.async_views)
+    when the request is handled asynchronously, i.e. through asgi.py, and
+    with the sync ones under WSGI, where an async view would need an event
+    loop of its own for every request.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            request.urlconf = ASYNC_URLCONF
+            return await get_response(request)
+        return middleware
+    return get_response
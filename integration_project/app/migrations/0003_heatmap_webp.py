@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_data_generation_heatmap'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='correlationheatmap',
+            name='webp',
+            field=models.BinaryField(null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_heatmap_webp'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='conflict',
+            name='commodity',
+            field=models.ForeignObject(from_fields=['year'], on_delete=django.db.models.deletion.DO_NOTHING, related_name='conflicts', to='app.commodity', to_fields=['year']),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:08
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def populate_conflict_stats(apps, schema_editor):
+    Conflict = apps.get_model('app', 'Conflict')
+    ConflictYearStats = apps.get_model('app', 'ConflictYearStats')
+    ConflictLocationStats = apps.get_model('app', 'ConflictLocationStats')
+
+    year_rows = (
+        Conflict.objects
+        .values('year', 'type_of_conflict', 'intensity_level')
+        .annotate(count=Count('conflict_id'), cumulative_intensity_total=Sum('cumulative_intensity'))
+        .order_by()
+    )
+    location_rows = Conflict.objects.values('location').annotate(count=Count('conflict_id')).order_by()
+
+    ConflictYearStats.objects.bulk_create(ConflictYearStats(**row) for row in year_rows)
+    ConflictLocationStats.objects.bulk_create(ConflictLocationStats(**row) for row in location_rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_conflict_commodity_relation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConflictLocationStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(max_length=255, unique=True)),
+                ('count', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ConflictYearStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('type_of_conflict', models.IntegerField()),
+                ('intensity_level', models.IntegerField()),
+                ('count', models.PositiveIntegerField()),
+                ('cumulative_intensity_total', models.PositiveIntegerField()),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('year', 'type_of_conflict', 'intensity_level'), name='unique_conflict_year_stats')],
+            },
+        ),
+        migrations.RunPython(populate_conflict_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_conflict_stats'),
+    ]
+
+    # conflict_id stops being the primary key first, so that adding the
+    # surrogate key numbers the existing rows instead of clashing with it.
+    operations = [
+        migrations.AlterField(
+            model_name='conflict',
+            name='conflict_id',
+            field=models.IntegerField(),
+        ),
+        migrations.AddField(
+            model_name='conflict',
+            name='id',
+            field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+        ),
+        migrations.AddConstraint(
+            model_name='conflict',
+            constraint=models.UniqueConstraint(fields=('conflict_id', 'year'), name='unique_conflict_year'),
+        ),
+    ]
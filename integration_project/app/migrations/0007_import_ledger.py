@@ -0,0 +1,47 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_conflict_year_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YearGeneration',
+            fields=[
+                ('year', models.IntegerField(primary_key=True, serialize=False)),
+                ('generation', models.PositiveIntegerField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ImportedFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=32)),
+                ('path', models.CharField(max_length=1024)),
+                ('sha256', models.CharField(max_length=64)),
+                ('changeset', models.JSONField(default=dict)),
+                ('imported_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', '-imported_at'], name='imported_file_latest')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RowFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=32)),
+                ('key', models.CharField(max_length=64)),
+                ('year', models.IntegerField()),
+                ('digest', models.CharField(max_length=32)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'key'), name='unique_row_fingerprint')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 10:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_import_ledger'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='conflict',
+            index=models.Index(fields=['year', 'conflict_id'], name='conflict_year_key'),
+        ),
+        migrations.AddIndex(
+            model_name='conflict',
+            index=models.Index(fields=['type_of_conflict', 'year', 'conflict_id'], name='conflict_type_year'),
+        ),
+        migrations.AddIndex(
+            model_name='conflict',
+            index=models.Index(fields=['intensity_level', 'year', 'conflict_id'], name='conflict_intensity_year'),
+        ),
+        migrations.AddIndex(
+            model_name='conflict',
+            index=models.Index(fields=['year', 'type_of_conflict', 'intensity_level'], include=('conflict_id', 'cumulative_intensity'), name='conflict_year_rollup'),
+        ),
+        migrations.AddIndex(
+            model_name='conflict',
+            index=models.Index(fields=['location', 'conflict_id'], name='conflict_location_rollup'),
+        ),
+    ]
@@ -7,7 +7,8 @@ class Conflict(models.Model):
     (3, 'Type 3'),
     (4, 'Type 4'),
     )
-    conflict_id = models.IntegerField(primary_key=True)
+    # UCDP rows are conflict-years: the same conflict_id recurs once per year.
+    conflict_id = models.IntegerField()
     location = models.CharField(max_length=255)
     side_a = models.CharField(max_length=255)
     side_a_id = models.IntegerField()
@@ -26,6 +27,39 @@ class Conflict(models.Model):
     ep_end = models.IntegerField(blank=True, null=True)
     ep_end_date = models.DateField(blank=True, null=True)
 
+    # Commodity prices for the conflict's year. No column or constraint is
+    # created; it only lets the ORM join the two tables on year in SQL.
+    commodity = models.ForeignObject(
+        'Commodity',
+        on_delete=models.DO_NOTHING,
+        from_fields=['year'],
+        to_fields=['year'],
+        related_name='conflicts',
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['conflict_id', 'year'], name='unique_conflict_year'),
+        ]
+        # One index per access path; app.tests.ConflictQueryPlanTests checks
+        # the views' plans still use them.
+        indexes = [
+            # Keyset pages ordered by (year, conflict_id), year ranges, and
+            # the join to Commodity on year.
+            models.Index(fields=['year', 'conflict_id'], name='conflict_year_key'),
+            # The same pages filtered by type or intensity.
+            models.Index(fields=['type_of_conflict', 'year', 'conflict_id'], name='conflict_type_year'),
+            models.Index(fields=['intensity_level', 'year', 'conflict_id'], name='conflict_intensity_year'),
+            # Covering, so the rollup refresh is an index-only scan already
+            # in GROUP BY order.
+            models.Index(
+                fields=['year', 'type_of_conflict', 'intensity_level'],
+                include=['conflict_id', 'cumulative_intensity'],
+                name='conflict_year_rollup',
+            ),
+            models.Index(fields=['location', 'conflict_id'], name='conflict_location_rollup'),
+        ]
+
     def __str__(self):
         return f"Conflict {self.side_a} - {self.side_b} ({self.year})"
 
@@ -131,3 +165,106 @@ class Commodity(models.Model):
     class Meta:
         verbose_name = "Commodity"
         verbose_name_plural = "Commodities"
+
+
+class ConflictYearStats(models.Model):
+    """
+    Conflict counts per year, type and intensity level.
+
+    A rollup of Conflict rebuilt by import_conflicts, so dashboards group a
+    few hundred rows instead of scanning the whole conflict table.
+    """
+    year = models.IntegerField()
+    type_of_conflict = models.IntegerField()
+    intensity_level = models.IntegerField()
+    count = models.PositiveIntegerField()
+    cumulative_intensity_total = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.count} conflicts in {self.year} (type {self.type_of_conflict}, intensity {self.intensity_level})"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['year', 'type_of_conflict', 'intensity_level'],
+                name='unique_conflict_year_stats',
+            ),
+        ]
+
+
+class ConflictLocationStats(models.Model):
+    """Conflict counts per location, rebuilt by import_conflicts."""
+    location = models.CharField(max_length=255, unique=True)
+    count = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.count} conflicts in {self.location}"
+
+
+class DataGeneration(models.Model):
+    """
+    Singleton row bumped by the import commands whenever source data changes.
+    Derived artifacts (heatmap, caches) are keyed on its ``generation``.
+    """
+    generation = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Data generation {self.generation}"
+
+
+class YearGeneration(models.Model):
+    """
+    The data generation in which each year's rows last changed, so responses
+    scoped to a year range only revalidate when one of their years changes.
+    """
+    year = models.IntegerField(primary_key=True)
+    generation = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.year} changed in generation {self.generation}"
+
+
+class ImportedFile(models.Model):
+    """One import of a source file, with its fingerprint and changeset."""
+    source = models.CharField(max_length=32)
+    path = models.CharField(max_length=1024)
+    sha256 = models.CharField(max_length=64)
+    # {'created', 'updated', 'removed', 'unchanged': row counts, 'years': [...]}
+    changeset = models.JSONField(default=dict)
+    imported_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source} import of {self.path} ({self.sha256[:12]})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', '-imported_at'], name='imported_file_latest'),
+        ]
+
+
+class RowFingerprint(models.Model):
+    """Content hash of a source row as last imported, keyed by its natural key."""
+    source = models.CharField(max_length=32)
+    key = models.CharField(max_length=64)
+    year = models.IntegerField()
+    digest = models.CharField(max_length=32)
+
+    def __str__(self):
+        return f"{self.source} {self.key}: {self.digest}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'key'], name='unique_row_fingerprint'),
+        ]
+
+
+class CorrelationHeatmap(models.Model):
+    """Rendered correlation heatmap for a single data generation."""
+    generation = models.PositiveIntegerField(unique=True)
+    png = models.BinaryField()
+    webp = models.BinaryField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Correlation heatmap (generation {self.generation})"
@@ -0,0 +1,129 @@
+"""
+Database routing for the optional read replica.
+
+Reads made inside a read-only scope go to the 'replica' alias when one is
+configured (settings.DB_REPLICA). transactional(read_only=True) views and the
+REST API's GET handlers (read_from_replica) open such a scope; everything
+else, including every write, the imports, and sessions and users, uses
+'default'.
+
+The alias is chosen once when the scope is entered. For
+settings.REPLICA_PIN_SECONDS after an import bumps the data generation, new
+scopes stay on the primary, so readers don't get the old data back from a
+replica that hasn't replayed the import yet. The pin is the generation's
+``updated_at`` as read from the primary, which every web process sees; while
+pinning is enabled this costs one primary-key lookup on the primary per scope.
+"""
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from .generation import GENERATION_PK
+from .models import DataGeneration
+
+REPLICA = 'replica'
+
+# Sessions and users are written on login and read right after it, so they
+# are always read from the primary.
+PRIMARY_ONLY_APPS = {'admin', 'auth', 'contenttypes', 'sessions'}
+
+_read_alias = ContextVar('read_alias', default=None)
+
+
+def replica_configured():
+    return REPLICA in connections.settings
+
+
+def _pin_seconds():
+    """REPLICA_PIN_SECONDS, or 0 when there is no replica to avoid."""
+    return getattr(settings, 'REPLICA_PIN_SECONDS', 0) if replica_configured() else 0
+
+
+def _last_import():
+    return DataGeneration.objects.using(DEFAULT_DB_ALIAS).filter(pk=GENERATION_PK).values_list('updated_at', flat=True)
+
+
+def _alias(updated_at, seconds):
+    if updated_at is not None and timezone.now() - updated_at < timedelta(seconds=seconds):
+        return DEFAULT_DB_ALIAS
+    return REPLICA
+
+
+def read_alias():
+    """The alias a read-only scope entered now should use."""
+    if not replica_configured():
+        return DEFAULT_DB_ALIAS
+    seconds = _pin_seconds()
+    return _alias(_last_import().first() if seconds else None, seconds)
+
+
+async def aread_alias():
+    """Async version of read_alias()."""
+    if not replica_configured():
+        return DEFAULT_DB_ALIAS
+    seconds = _pin_seconds()
+    return _alias(await _last_import().afirst() if seconds else None, seconds)
+
+
+@contextmanager
+def read_only_scope():
+    """Route reads to the replica until exit; yields the alias in use."""
+    alias = read_alias()
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+@asynccontextmanager
+async def aread_only_scope():
+    """read_only_scope() for async code."""
+    alias = await aread_alias()
+    token = _read_alias.set(alias)
+    try:
+        yield alias
+    finally:
+        _read_alias.reset(token)
+
+
+def read_from_replica(fn):
+    """Run ``fn``, a sync or async function, in a read_only_scope()."""
+    if iscoroutinefunction(fn):
+        @wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            async with aread_only_scope():
+                return await fn(*args, **kwargs)
+        return async_wrapper
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        with read_only_scope():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Sends reads in a read-only scope to its alias and everything else to 'default'."""
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
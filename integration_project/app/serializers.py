@@ -1,10 +1,31 @@
+from functools import lru_cache
+
 from rest_framework import serializers
+from rest_framework.settings import ISO_8601
 from app.models import Commodity, Conflict
 
-class ConflictSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    A ModelSerializer that takes an additional `fields` argument that
+    controls which fields should be displayed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            # Drop any fields that are not specified in the `fields` argument.
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class ConflictSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Conflict
-        fields = '__all__'
+        # 'commodity' is a join on year, not a stored column; 'id' is a
+        # surrogate key, (conflict_id, year) identifies a row.
+        exclude = ['id', 'commodity']
         
     
 class CommoditySerializer(serializers.ModelSerializer):
@@ -29,4 +50,68 @@ class ConflictIntensitySerializer(serializers.Serializer):
 
 class ConflictTypeSerializer(serializers.Serializer):
     type_of_conflict = serializers.IntegerField()
-    total = serializers.IntegerField()
\ No newline at end of file
+    total = serializers.IntegerField()
+
+
+class FastReadSerializer:
+    """
+    Read-only fast path producing the same output as a ModelSerializer.
+
+    The serializer's fields are compiled once into a column plan (output
+    name, model attribute, converter). Rows are then read with values_list()
+    and converted a column at a time, skipping model instances and DRF's
+    per-field to_representation() for the types whose representation is the
+    database value itself. Use get_fast_serializer() to reuse plans.
+    """
+
+    # Field types whose representation of a database value is the value.
+    IDENTITY_FIELDS = (serializers.IntegerField, serializers.FloatField, serializers.CharField)
+
+    def __init__(self, serializer):
+        self.field_names = []
+        self.sources = []
+        self.converters = []
+        for name, field in serializer.fields.items():
+            self.field_names.append(name)
+            self.sources.append(field.source)
+            self.converters.append(self._compile(field))
+
+    @classmethod
+    def _compile(cls, field):
+        if type(field) in cls.IDENTITY_FIELDS:
+            return None
+        if type(field) is serializers.DateField and getattr(field, 'format', None) == ISO_8601:
+            return lambda value: value.isoformat()
+        return field.to_representation
+
+    def values(self, queryset, extra=()):
+        """
+        values_list() of the planned columns, followed by ``extra`` ones that
+        are needed (e.g. for pagination) but not output. Rows are named
+        tuples so paginators can read attributes from them.
+        """
+        columns = self.sources + [name for name in extra if name not in self.sources]
+        return queryset.values_list(*columns, named=True)
+
+    def to_representation(self, rows):
+        """Convert rows from values() into a list of output dicts."""
+        if not rows:
+            return []
+        width = len(self.field_names)
+        columns = list(zip(*rows))[:width]
+        for i, convert in enumerate(self.converters):
+            if convert is not None:
+                columns[i] = [None if value is None else convert(value) for value in columns[i]]
+        names = self.field_names
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+
+@lru_cache(maxsize=128)
+def get_fast_serializer(serializer_class, fields=None):
+    """
+    FastReadSerializer for ``serializer_class`` (optionally narrowed to the
+    ``fields`` tuple), compiled once and reused.
+    """
+    if fields is None:
+        return FastReadSerializer(serializer_class())
+    return FastReadSerializer(serializer_class(fields=fields))
@@ -0,0 +1,248 @@
+"""
+Conflict aggregates served from the ConflictYearStats / ConflictLocationStats
+rollups, plus the main dashboard summary.
+
+The rollups are rebuilt by refresh_conflict_stats() at the end of every
+conflict import, for the years it changed; the read helpers below return the
+same shapes the views used to compute with GROUP BY queries over the full
+Conflict table. The ``a``-prefixed helpers are the async versions for the
+async views.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from .generation import acached_for_generation, cached_for_generation
+from .models import Commodity, Conflict, ConflictLocationStats, ConflictYearStats
+
+
+def refresh_conflict_stats(years=None):
+    """
+    Rebuild the conflict rollups from the Conflict table.
+
+    With ``years``, only those years' rows of the year rollup are rebuilt.
+    The location rollup counts conflicts across all years, so it is always
+    rebuilt whole; it is a single GROUP BY over the table.
+    """
+    conflicts = Conflict.objects.all()
+    year_stats = ConflictYearStats.objects.all()
+    if years is not None:
+        conflicts = conflicts.filter(year__in=years)
+        year_stats = year_stats.filter(year__in=years)
+
+    year_rows = (
+        conflicts
+        .values('year', 'type_of_conflict', 'intensity_level')
+        .annotate(count=Count('conflict_id'), cumulative_intensity_total=Sum('cumulative_intensity'))
+        .order_by()
+    )
+    # Conflicts recur once per year; a location counts each conflict once.
+    location_rows = (
+        Conflict.objects
+        .values('location')
+        .annotate(count=Count('conflict_id', distinct=True))
+        .order_by()
+    )
+
+    with transaction.atomic():
+        year_stats.delete()
+        ConflictLocationStats.objects.all().delete()
+        ConflictYearStats.objects.bulk_create(ConflictYearStats(**row) for row in year_rows)
+        ConflictLocationStats.objects.bulk_create(ConflictLocationStats(**row) for row in location_rows)
+
+
+def _yearly_totals():
+    return ConflictYearStats.objects.values('year').annotate(total=Sum('count')).order_by('year')
+
+
+def yearly_totals():
+    """[{'year', 'total'}] ordered by year."""
+    return list(_yearly_totals())
+
+
+async def ayearly_totals():
+    return [row async for row in _yearly_totals()]
+
+
+def yearly_type_counts():
+    """[{'year', 'total', 'type1' .. 'type4'}] ordered by year."""
+    return list(
+        ConflictYearStats.objects.values('year').annotate(
+            total=Sum('count'),
+            type1=Sum('count', filter=Q(type_of_conflict=1), default=0),
+            type2=Sum('count', filter=Q(type_of_conflict=2), default=0),
+            type3=Sum('count', filter=Q(type_of_conflict=3), default=0),
+            type4=Sum('count', filter=Q(type_of_conflict=4), default=0),
+        ).order_by('year')
+    )
+
+
+def _yearly_intensity_counts():
+    return (
+        ConflictYearStats.objects.values('year', 'intensity_level')
+        .annotate(count=Sum('count'))
+        .order_by('year', 'intensity_level')
+    )
+
+
+def yearly_intensity_counts():
+    """[{'year', 'intensity_level', 'count'}] ordered by year and level."""
+    return list(_yearly_intensity_counts())
+
+
+async def ayearly_intensity_counts():
+    return [row async for row in _yearly_intensity_counts()]
+
+
+def intensity_counts():
+    """[{'intensity_level', 'count'}] ordered by level."""
+    return list(
+        ConflictYearStats.objects.values('intensity_level')
+        .annotate(count=Sum('count'))
+        .order_by('intensity_level')
+    )
+
+
+def _type_counts():
+    return ConflictYearStats.objects.values('type_of_conflict').annotate(total=Sum('count')).order_by('type_of_conflict')
+
+
+def type_counts():
+    """[{'type_of_conflict', 'total'}] ordered by type."""
+    return list(_type_counts())
+
+
+async def atype_counts():
+    return [row async for row in _type_counts()]
+
+
+def _top_locations(limit):
+    return ConflictLocationStats.objects.values('location', 'count').order_by('-count')[:limit]
+
+
+def top_locations(limit=10):
+    """The ``limit`` locations with most conflicts: [{'location', 'count'}]."""
+    return list(_top_locations(limit))
+
+
+async def atop_locations(limit=10):
+    return [row async for row in _top_locations(limit)]
+
+
+def yearly_intensity_summary():
+    """
+    [{'year', 'total_conflicts', 'avg_intensity', 'total_cumulative_intensity'}]
+    ordered by year, as used by the correlation heatmap.
+    """
+    rows = (
+        ConflictYearStats.objects.values('year')
+        .annotate(
+            total_conflicts=Sum('count'),
+            intensity_sum=Sum(F('intensity_level') * F('count')),
+            total_cumulative_intensity=Sum('cumulative_intensity_total'),
+        )
+        .order_by('year')
+    )
+    return [
+        {
+            'year': row['year'],
+            'total_conflicts': row['total_conflicts'],
+            'avg_intensity': row['intensity_sum'] / row['total_conflicts'],
+            'total_cumulative_intensity': row['total_cumulative_intensity'],
+        }
+        for row in rows
+    ]
+
+
+def _conflict_stats_rows():
+    return ConflictYearStats.objects.values_list('year', 'type_of_conflict', 'intensity_level', 'count')
+
+
+def _fold_conflict_stats(rows, locations):
+    # The year rollup is at most years x types x levels rows, so one scan of
+    # it feeds every breakdown.
+    by_year = {}
+    by_year_intensity = defaultdict(int)
+    by_intensity = defaultdict(int)
+    by_type = defaultdict(int)
+    for year, type_of_conflict, intensity_level, count in rows:
+        totals = by_year.setdefault(year, {'year': year, 'total': 0, 'type1': 0, 'type2': 0, 'type3': 0, 'type4': 0})
+        totals['total'] += count
+        if f'type{type_of_conflict}' in totals:
+            totals[f'type{type_of_conflict}'] += count
+        by_year_intensity[year, intensity_level] += count
+        by_intensity[intensity_level] += count
+        by_type[type_of_conflict] += count
+
+    return {
+        'yearly_data': [by_year[year] for year in sorted(by_year)],
+        'yearly_intensity_data': [
+            {'year': year, 'intensity_level': level, 'count': count}
+            for (year, level), count in sorted(by_year_intensity.items())
+        ],
+        'intensity_data': [
+            {'intensity_level': level, 'count': count}
+            for level, count in sorted(by_intensity.items())
+        ],
+        'conflict_types': [
+            {'type_of_conflict': type_of_conflict, 'total': total}
+            for type_of_conflict, total in sorted(by_type.items())
+        ],
+        'location_data': locations,
+    }
+
+
+def _compute_conflict_stats():
+    return _fold_conflict_stats(_conflict_stats_rows(), top_locations(10))
+
+
+async def _acompute_conflict_stats():
+    rows = [row async for row in _conflict_stats_rows()]
+    return _fold_conflict_stats(rows, await atop_locations(10))
+
+
+def conflict_stats():
+    """
+    Every conflict breakdown the dashboards chart, cached for the current
+    data generation:
+
+    yearly_data: as yearly_type_counts()
+    yearly_intensity_data: as yearly_intensity_counts()
+    intensity_data: as intensity_counts()
+    conflict_types: as type_counts()
+    location_data: as top_locations(10)
+    """
+    return cached_for_generation('conflict-stats', _compute_conflict_stats)
+
+
+async def aconflict_stats():
+    return await acached_for_generation('conflict-stats', _acompute_conflict_stats)
+
+
+def _compute_dashboard_summary():
+    commodity = Commodity.objects.aggregate(
+        total=Count('year', distinct=True),
+        earliest=Min('year'),
+        latest=Max('year'),
+    )
+    # Distinct conflicts, not conflict-years; cached, so the scan is rare.
+    conflict = Conflict.objects.aggregate(
+        total=Count('conflict_id', distinct=True),
+        latest=Max('year'),
+    )
+    return {
+        'total_commodities': commodity['total'],
+        'earliest_commodity_year': commodity['earliest'],
+        'latest_commodity_year': commodity['latest'],
+        'total_conflicts': conflict['total'],
+        'latest_conflict_year': conflict['latest'],
+    }
+
+
+def dashboard_summary():
+    """
+    Main dashboard KPIs: one aggregate query per table, cached for the
+    current data generation.
+    """
+    return cached_for_generation('dashboard-summary', _compute_dashboard_summary)
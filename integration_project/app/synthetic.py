@@ -0,0 +1,121 @@
+"""
+Synthetic conflict and commodity data for load testing.
+
+The rows have the shape of the bundled data files and are written as CSV in
+the layout the imports read (see the generate_data command), so generated
+data takes the same path into the database as real data. Everything is
+drawn from a seeded generator: the same arguments give the same files.
+
+Conflicts run over consecutive years, like the UCDP conflict-years: each
+one has a location, two sides and a type, starts at a random year and lasts
+a geometrically distributed number of years, escalating to intensity 2 now
+and then. Commodity prices are yearly (Commodity holds one row per year)
+and follow a random walk per column.
+"""
+import csv
+import gzip
+from datetime import date
+
+import numpy as np
+
+from .commodity_store import PRICE_FIELDS
+from .conflict_import import MIN_YEAR
+from .models import Conflict
+
+FIRST_YEAR = MIN_YEAR + 1
+LAST_YEAR = 2024
+
+CONFLICT_FIELDS = [field.name for field in Conflict._meta.concrete_fields if not field.auto_created]
+COMMODITY_FIELDS = ['year', *PRICE_FIELDS]
+
+# Mean conflict length in years.
+MEAN_DURATION = 6
+
+LOCATIONS = 180
+TYPE_WEIGHTS = [0.05, 0.1, 0.7, 0.15]
+ESCALATION = 0.2
+
+# Conflict-years generated per batch.
+BATCH_SIZE = 100_000
+
+
+def conflict_rows(count, first_year=FIRST_YEAR, last_year=LAST_YEAR, seed=0, first_id=100_000):
+    """
+    Yield ``count`` conflict-years as lists ordered like CONFLICT_FIELDS,
+    conflict by conflict. (conflict_id, year) is unique; conflict ids start
+    at ``first_id``.
+    """
+    if last_year < first_year:
+        raise ValueError('last_year is before first_year')
+    rng = np.random.default_rng(seed)
+    span = last_year - first_year + 1
+    conflict_id = first_id
+    remaining = count
+
+    while remaining > 0:
+        conflicts = max(1, min(remaining, BATCH_SIZE) // MEAN_DURATION)
+        starts = rng.integers(first_year, last_year + 1, conflicts)
+        durations = np.minimum(rng.geometric(1 / MEAN_DURATION, conflicts), last_year - starts + 1)
+        escalations = rng.random((conflicts, min(span, durations.max()))) < ESCALATION
+        locations = rng.integers(0, LOCATIONS, conflicts).tolist()
+        types = rng.choice(np.arange(1, 5), conflicts, p=TYPE_WEIGHTS).tolist()
+        starts, durations = starts.tolist(), durations.tolist()
+
+        for i in range(conflicts):
+            location = f'Country {locations[i]}'
+            territory = f'Region {conflict_id % 97}' if types[i] == 1 else ''
+            start = starts[i]
+            start_date = date(start, 1 + conflict_id % 12, 1 + conflict_id % 28).isoformat()
+            cumulative = 0
+            for offset in range(min(durations[i], remaining)):
+                year = start + offset
+                intensity = 2 if escalations[i, offset] else 1
+                cumulative = max(cumulative, intensity - 1)
+                last = offset == durations[i] - 1
+                yield [
+                    conflict_id,
+                    location,
+                    f'Government of {location}',
+                    locations[i],
+                    '',
+                    f'Armed group {conflict_id}',
+                    str(conflict_id),
+                    '',
+                    territory,
+                    year,
+                    intensity,
+                    cumulative,
+                    types[i],
+                    start_date,
+                    start_date if offset == 0 else f'{year}-01-01',
+                    1,
+                    int(last),
+                    f'{year}-12-31' if last else '',
+                ]
+                remaining -= 1
+            conflict_id += 1
+
+
+def commodity_rows(first_year=FIRST_YEAR, last_year=LAST_YEAR, seed=0):
+    """Yield one row of prices per year, as lists ordered like COMMODITY_FIELDS."""
+    rng = np.random.default_rng(seed)
+    years = np.arange(first_year, last_year + 1)
+    base = rng.uniform(1, 2000, len(PRICE_FIELDS))
+    # Yearly log returns of around 15%, with a slight upward drift.
+    walks = np.exp(np.cumsum(rng.normal(0.02, 0.15, (len(years), len(PRICE_FIELDS))), axis=0))
+    prices = np.round(base * walks, 4)
+    for year, row in zip(years.tolist(), prices.tolist()):
+        yield [year, *row]
+
+
+def write_csv(path, fields, rows):
+    """Write ``rows`` under a header of ``fields``; gzipped if ``path`` ends in .gz. Returns the row count."""
+    opener = gzip.open if str(path).endswith('.gz') else open
+    written = 0
+    with opener(path, 'wt', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        for row in rows:
+            writer.writerow(row)
+            written += 1
+    return written
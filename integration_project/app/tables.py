@@ -0,0 +1,219 @@
+"""
+Server-side paging, filtering and column projection for the correlation tables.
+
+Rows are fetched a page at a time with keyset pagination, so every page is an
+index-friendly ``WHERE (year, conflict_id) > (...) ORDER BY ... LIMIT n``
+query no matter how deep the user scrolls. The join runs in the database
+through the ``Conflict.commodity`` relation.
+"""
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import CharField, Q
+
+from .models import Commodity, Conflict
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Models that make up each table, in column order.
+TABLE_MODELS = {
+    'commodities': (Commodity,),
+    'conflicts': (Conflict,),
+    'join': (Conflict, Commodity),
+}
+
+# Columns the keyset is built on; together they are unique within the table.
+TABLE_KEYS = {
+    'commodities': ('year',),
+    'conflicts': ('year', 'conflict_id'),
+    'join': ('year', 'conflict_id'),
+}
+
+
+def keyset_filter(key, after, descending=False):
+    """
+    Q for the rows strictly after ``after`` (values of the ``key`` columns)
+    when ordered by ``key``, or strictly before it with ``descending``:
+    ``(a, b) > (x, y)`` spelled ``a > x OR (a = x AND b > y)``.
+    """
+    lookup = 'lt' if descending else 'gt'
+    condition = Q()
+    for i in reversed(range(len(key))):
+        equal = {name: value for name, value in zip(key[:i], after[:i])}
+        step = Q(**equal, **{f'{key[i]}__{lookup}': after[i]})
+        condition = step if i == len(key) - 1 else step | condition
+    return condition
+
+
+class TableQueryError(ValueError):
+    """Raised for invalid table query parameters."""
+
+
+def _parse_int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise TableQueryError(f'Invalid {name}: {value}')
+
+
+class TableQuery:
+    """
+    A single page request against one of the correlation tables.
+
+    Built from request GET parameters:
+
+    table: 'commodities' | 'conflicts' | 'join'
+    fields: column names, comma separated and/or repeated (default: all)
+    after: keyset cursor returned as ``next`` by the previous page
+    limit: page size, at most MAX_PAGE_SIZE
+    order: 'asc' | 'desc' on the keyset
+    year_from, year_to: inclusive year range
+    q: case-insensitive search over the text columns
+    """
+
+    def __init__(self, table, params):
+        if table not in TABLE_MODELS:
+            raise TableQueryError(f'Invalid table name: {table}')
+        self.table = table
+        self.models = TABLE_MODELS[table]
+        self.key = TABLE_KEYS[table]
+
+        # Field name -> model owning it. On the join, 'year' is the conflict's.
+        # Surrogate keys are not shown.
+        self.field_models = {}
+        for model in self.models:
+            for field in model._meta.concrete_fields:
+                if not field.auto_created:
+                    self.field_models.setdefault(field.name, model)
+        self.available_fields = list(self.field_models)
+
+        self.fields = self._parse_fields(params)
+        self.after = self._parse_cursor(params.get('after'))
+        self.limit = min(_parse_int(params.get('limit', DEFAULT_PAGE_SIZE), 'limit'), MAX_PAGE_SIZE)
+        if self.limit < 1:
+            raise TableQueryError(f'Invalid limit: {self.limit}')
+        self.descending = params.get('order', 'asc') == 'desc'
+        self.year_from = params.get('year_from') or None
+        self.year_to = params.get('year_to') or None
+        if self.year_from is not None:
+            self.year_from = _parse_int(self.year_from, 'year_from')
+        if self.year_to is not None:
+            self.year_to = _parse_int(self.year_to, 'year_to')
+        self.search = (params.get('q') or '').strip()
+
+    def _parse_fields(self, params):
+        requested = []
+        for value in params.getlist('fields'):
+            requested.extend(name.strip() for name in value.split(',') if name.strip())
+        if not requested:
+            return list(self.available_fields)
+
+        unknown = [name for name in requested if name not in self.field_models]
+        if unknown:
+            raise TableQueryError(f'Invalid fields: {", ".join(unknown)}')
+        # Keep the table's column order regardless of the order requested.
+        return [name for name in self.available_fields if name in requested]
+
+    def _parse_cursor(self, cursor):
+        if not cursor:
+            return None
+        values = cursor.split(',')
+        if len(values) != len(self.key):
+            raise TableQueryError(f'Invalid cursor: {cursor}')
+        return tuple(_parse_int(value, 'cursor') for value in values)
+
+    @property
+    def verbose_names(self):
+        return [
+            str(self.field_models[name]._meta.get_field(name).verbose_name)
+            for name in self.fields
+        ]
+
+    def _keyset_filter(self):
+        """Rows strictly after the cursor in keyset order."""
+        return keyset_filter(self.key, self.after, self.descending)
+
+    def _base_queryset(self):
+        model = self.models[0]
+        queryset = model.objects.all()
+
+        if self.year_from is not None:
+            queryset = queryset.filter(year__gte=self.year_from)
+        if self.year_to is not None:
+            queryset = queryset.filter(year__lte=self.year_to)
+
+        if self.search:
+            text_fields = [f.name for f in model._meta.concrete_fields if isinstance(f, CharField)]
+            if text_fields:
+                search = Q()
+                for name in text_fields:
+                    search |= Q(**{f'{name}__icontains': self.search})
+                queryset = queryset.filter(search)
+            else:
+                queryset = queryset.none()
+
+        if self.table == 'join':
+            # Inner join semantics even when no commodity column is selected
+            # (and so no JOIN is emitted).
+            queryset = queryset.filter(year__in=Commodity.objects.values('year'))
+
+        if self.after is not None:
+            queryset = queryset.filter(self._keyset_filter())
+
+        prefix = '-' if self.descending else ''
+        return queryset.order_by(*(prefix + name for name in self.key))
+
+    def _lookups(self):
+        """
+        ORM lookups to select: the chosen fields in order, followed by any
+        keyset columns needed for the cursor that were not chosen.
+        """
+        lookups = []
+        for name in self.fields:
+            if self.table == 'join' and self.field_models[name] is Commodity:
+                lookups.append(f'commodity__{name}')
+            else:
+                lookups.append(name)
+        lookups.extend(name for name in self.key if name not in self.fields)
+        self._key_positions = [lookups.index(name) for name in self.key]
+        return lookups
+
+    def _cursor_for(self, record):
+        return ','.join(str(record[i]) for i in self._key_positions)
+
+    def page(self):
+        """
+        Return ``(rows, next_cursor)``. Rows are lists ordered like ``fields``;
+        ``next_cursor`` is None on the last page.
+        """
+        records = list(self._base_queryset().values_list(*self._lookups())[:self.limit + 1])
+        has_more = len(records) > self.limit
+        records = records[:self.limit]
+
+        next_cursor = self._cursor_for(records[-1]) if has_more and records else None
+        width = len(self.fields)
+        return [list(record[:width]) for record in records], next_cursor
+
+    def iter_rows(self, chunk_size=2000):
+        """
+        Yield every matching row (ignoring ``limit``) as a tuple ordered like
+        ``fields``. On PostgreSQL this reads through a server-side cursor, so
+        memory stays flat regardless of the result size.
+        """
+        width = len(self.fields)
+        queryset = self._base_queryset().values_list(*self._lookups())
+        for record in queryset.iterator(chunk_size=chunk_size):
+            yield record[:width]
+
+    async def aiter_rows(self, chunk_size=2000):
+        """
+        iter_rows() for async code: the rows are fetched a chunk at a time
+        in the thread that owns the connection. (QuerySet.aiterator() would
+        run a values_list() query on the event loop itself.)
+        """
+        rows = self.iter_rows(chunk_size)
+        fetch = sync_to_async(lambda: list(islice(rows, chunk_size)))
+        while chunk := await fetch():
+            for row in chunk:
+                yield row
@@ -1,3 +1,1084 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import itertools
+import os
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, connections
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .commodity_import import CommodityDataset, CommodityImportError
+from .commodity_store import encode_years
+from .conflict_import import import_conflicts
+from .copy_load import copy_into, copy_supported
+from .generation import bump_generation
+from .heatmap import refresh_heatmap
+from .importing import DataImportError
+from .loadtest import endpoints, percentile, run_load_test
+from .middleware import brotli
+from .models import Commodity, Conflict, CorrelationHeatmap, DataGeneration, ImportedFile
+from .routers import ReplicaRouter, aread_only_scope, read_only_scope
+from .serializers import CommoditySerializer, ConflictSerializer, get_fast_serializer
+from . import heatmap, importing, stats
+from .stats import refresh_conflict_stats
+from .synthetic import commodity_rows, conflict_rows
+from .views import IsolationLevel, transactional
+
+
+def create_conflicts(count, first_year=1990):
+    Conflict.objects.bulk_create(
+        Conflict(
+            conflict_id=i,
+            location=f'Location {i % 7}',
+            side_a=f'Government {i % 7}',
+            side_a_id=i % 7,
+            side_b=f'Rebels {i}',
+            side_b_id=str(i),
+            year=first_year + i % 20,
+            intensity_level=1 + i % 2,
+            cumulative_intensity=i % 2,
+            type_of_conflict=1 + i % 4,
+        )
+        for i in range(1, count + 1)
+    )
+    refresh_conflict_stats()
+
+
+def create_commodities(first_year=1990, last_year=2010):
+    Commodity.objects.bulk_create(
+        Commodity(year=year, cocoa=1.0 + year % 5, gold_troy_oz=300.0 + year)
+        for year in range(first_year, last_year + 1)
+    )
+
+
+# Transactional views start with SET TRANSACTION, which PostgreSQL only
+# accepts as the first statement of a transaction, so these tests can't run
+# inside TestCase's wrapping transaction.
+class MainDashboardQueryCountTests(TransactionTestCase):
+    """The landing page issues a fixed number of queries regardless of data size."""
+
+    # BEGIN, the transaction settings (one statement), session, user, data
+    # generation and COMMIT.
+    BASE_QUERIES = 6
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        self.url = reverse('app:main_dashboard')
+
+    def test_summary_values(self):
+        create_commodities(1990, 2010)
+        create_conflicts(50)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_commodities'], 21)
+        self.assertEqual(response.context['total_conflicts'], 50)
+        self.assertEqual(response.context['latest_commodity_year'], 2010)
+        self.assertEqual(response.context['latest_conflict_year'], 2009)
+        self.assertEqual(response.context['data_range'], '1990-2010')
+
+    def test_one_query_per_table_when_cold(self):
+        create_commodities()
+        create_conflicts(10)
+
+        with self.assertNumQueries(self.BASE_QUERIES + 2):
+            self.client.get(self.url)
+
+    def test_no_data_queries_when_cached(self):
+        create_commodities()
+        create_conflicts(10)
+        self.client.get(self.url)
+
+        with self.assertNumQueries(self.BASE_QUERIES):
+            self.client.get(self.url)
+
+    def test_query_count_does_not_grow_with_data(self):
+        create_commodities(1960, 2024)
+        create_conflicts(2000)
+
+        with self.assertNumQueries(self.BASE_QUERIES + 2):
+            self.client.get(self.url)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Transaction settings are PostgreSQL statements')
+class TransactionalTests(TransactionTestCase):
+    """transactional() applies its settings in one statement, for the transaction only."""
+
+    def current_settings(self):
+        with connection.cursor() as cur:
+            cur.execute(
+                "SELECT current_setting('transaction_isolation'), "
+                "current_setting('transaction_read_only'), current_setting('statement_timeout')"
+            )
+            return cur.fetchone()
+
+    def test_settings(self):
+        @transactional(IsolationLevel.REPEATABLE_READ, timeout=1234)
+        def view():
+            return self.current_settings()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(view(), ('repeatable read', 'on', '1234ms'))
+        self.assertEqual(len([q for q in queries.captured_queries if q['sql'].startswith('SET')]), 1)
+
+        with connection.cursor() as cur:
+            cur.execute("SELECT current_setting('transaction_read_only'), current_setting('statement_timeout')")
+            self.assertEqual(cur.fetchone(), ('off', '0'))
+
+    def test_async_view(self):
+        @transactional(IsolationLevel.REPEATABLE_READ, timeout=1234)
+        async def view():
+            # Separate trips to the database thread, both in the transaction.
+            return [await sync_to_async(self.current_settings)() for _ in range(2)]
+
+        self.assertEqual(async_to_sync(view)(), [('repeatable read', 'on', '1234ms')] * 2)
+        self.assertFalse(connection.in_atomic_block)
+
+
+class ReplicaRouterTests(TestCase):
+    """Reads in a read-only scope go to the replica; the rest stays on the primary."""
+
+    def setUp(self):
+        patcher = mock.patch('app.routers.replica_configured', return_value=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+
+    def test_scope(self):
+        self.assertEqual(self.router.db_for_read(Conflict), 'default')
+        with read_only_scope() as alias:
+            self.assertEqual(alias, 'replica')
+            self.assertEqual(self.router.db_for_read(Conflict), 'replica')
+            self.assertEqual(self.router.db_for_read(User), 'default')
+            self.assertEqual(self.router.db_for_write(Conflict), 'default')
+        self.assertEqual(self.router.db_for_read(Conflict), 'default')
+
+    @override_settings(REPLICA_PIN_SECONDS=30)
+    def test_pinned_after_import(self):
+        bump_generation()
+
+        with read_only_scope() as alias:
+            self.assertEqual(alias, 'default')
+            self.assertEqual(self.router.db_for_read(Conflict), 'default')
+
+        async def scope():
+            async with aread_only_scope() as alias:
+                return alias
+        self.assertEqual(async_to_sync(scope)(), 'default')
+
+        # The pin is the import time on the primary, not per-process state.
+        DataGeneration.objects.update(updated_at=timezone.now() - datetime.timedelta(seconds=31))
+        with read_only_scope() as alias:
+            self.assertEqual(alias, 'replica')
+        self.assertEqual(async_to_sync(scope)(), 'replica')
+
+    def test_no_pin_by_default(self):
+        bump_generation()
+
+        with self.assertNumQueries(0), read_only_scope() as alias:
+            self.assertEqual(alias, 'replica')
+
+
+@skipUnless('replica' in connections, 'No replica database configured')
+class ReplicaRoutingTests(TransactionTestCase):
+    """Read-only views and API GETs query the replica alias."""
+
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        create_commodities(1990, 1995)
+        create_conflicts(10)
+
+    def assertReadsFromReplica(self, url, params=None, get=None):
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = (get or self.client.get)(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('"app_conflict' in q['sql'] for q in replica.captured_queries))
+        self.assertFalse(any('"app_conflict' in q['sql'] for q in primary.captured_queries))
+
+    def test_api_get(self):
+        self.assertReadsFromReplica(reverse('app:conflict-list-api'))
+
+    def test_transactional_view(self):
+        self.assertReadsFromReplica(reverse('app:correlation_rows'), {'table': 'conflicts'})
+
+    def test_async_views(self):
+        get = async_to_sync(self.async_client.get)
+        self.assertReadsFromReplica(reverse('app:conflict-stats-api'), get=get)
+        cache.clear()
+        self.assertReadsFromReplica(reverse('app:dashboard_conflict_api'), get=get)
+
+
+class GenerationETagTests(TransactionTestCase):
+    """Read-only JSON endpoints revalidate against the data generation."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        create_commodities(1990, 1995)
+        create_conflicts(10)
+        bump_generation()
+        self.url = reverse('app:commodity-list')
+
+    def test_headers(self):
+        response = self.client.get(self.url, {'commodity': 'cocoa'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"data-1"')
+        self.assertIn('Last-Modified', response)
+        self.assertIn('private', response['Cache-Control'])
+        self.assertIn('max-age=', response['Cache-Control'])
+
+    def test_not_modified_skips_view(self):
+        etag = self.client.get(self.url, {'commodity': 'cocoa'})['ETag']
+
+        # Session, user and data generation only.
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'commodity': 'cocoa'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_import_invalidates(self):
+        etag = self.client.get(self.url, {'commodity': 'cocoa'})['ETag']
+        bump_generation()
+
+        response = self.client.get(self.url, {'commodity': 'cocoa'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], '"data-2"')
+
+    def test_errors_are_not_tagged(self):
+        response = self.client.get(self.url, {'commodity': 'unknown'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn('ETag', response)
+
+
+class AsyncViewTests(TransactionTestCase):
+    """Requests through ASGI get the async chart views, with the sync views' responses."""
+
+    ENDPOINTS = [
+        ('app:dashboard_commodity_api', {'commodity': 'cocoa'}),
+        ('app:dashboard_commodity_api', {'commodity': 'cocoa', 'encoding': 'columnar'}),
+        ('app:dashboard_commodity_api', {'commodity': 'unknown'}),
+        ('app:dashboard_conflict_api', {}),
+        ('app:conflict_data_api', {}),
+        ('app:conflict-intensity-api', {}),
+        ('app:conflict-type-api', {}),
+        ('app:conflict-stats-api', {}),
+        ('app:commodity-list', {'commodity': 'gold_troy_oz'}),
+        ('app:commodity-list', {'commodity': 'unknown'}),
+        ('app:commodity-list', {}),
+        ('app:commodity-series', {'commodities': 'cocoa,gold_troy_oz', 'from': '1992', 'to': '1994'}),
+        ('app:commodity-series', {'commodities': 'cocoa', 'from': 'x'}),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        self.async_client.force_login(user)
+        create_commodities(1990, 1995)
+        create_conflicts(10)
+        bump_generation([1992])
+
+    def test_same_responses(self):
+        for name, params in self.ENDPOINTS:
+            with self.subTest(name, **params):
+                url = reverse(name)
+                expected = self.client.get(url, params)
+                response = async_to_sync(self.async_client.get)(url, params)
+
+                self.assertEqual(response.resolver_match.func.__module__, 'app.async_views')
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.content, expected.content)
+                self.assertEqual(response.get('ETag'), expected.get('ETag'))
+
+    def test_export(self):
+        async def read(response):
+            return b''.join([chunk async for chunk in response.streaming_content])
+
+        url = reverse('app:correlation_export')
+        for params in ({'table': 'conflicts'}, {'table': 'join', 'format': 'ndjson'},
+                       {'format': 'xml', 'year_from': 1992}, {'format': 'pdf'}):
+            with self.subTest(**params):
+                expected = self.client.get(url, params)
+                response = async_to_sync(self.async_client.get)(url, params)
+
+                self.assertEqual(response.resolver_match.func.__module__, 'app.async_views')
+                self.assertEqual(response.status_code, expected.status_code)
+                if expected.streaming:
+                    self.assertTrue(response.is_async)
+                    self.assertEqual(async_to_sync(read)(response), b''.join(expected.streaming_content))
+                else:
+                    self.assertEqual(response.content, expected.content)
+
+    def test_not_modified(self):
+        url = reverse('app:conflict-stats-api')
+        etag = async_to_sync(self.async_client.get)(url)['ETag']
+
+        response = async_to_sync(self.async_client.get)(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_anonymous(self):
+        self.async_client.logout()
+
+        response = async_to_sync(self.async_client.get)(reverse('app:conflict-stats-api'))
+        self.assertEqual(response.status_code, 403)
+        response = async_to_sync(self.async_client.get)(reverse('app:dashboard_conflict_api'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_sync_views_under_wsgi(self):
+        response = self.client.get(reverse('app:conflict-stats-api'))
+        self.assertEqual(response.resolver_match.func.__module__, 'app.api_views')
+
+
+class ConflictStatsTests(TestCase):
+    """The consolidated payload matches the individual breakdowns."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_conflicts(200)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_matches_breakdowns(self):
+        self.assertEqual(stats.conflict_stats(), {
+            'yearly_data': stats.yearly_type_counts(),
+            'yearly_intensity_data': stats.yearly_intensity_counts(),
+            'intensity_data': stats.intensity_counts(),
+            'conflict_types': stats.type_counts(),
+            'location_data': stats.top_locations(10),
+        })
+
+    def test_cached(self):
+        stats.conflict_stats()
+        with self.assertNumQueries(1):
+            # Only the data generation is read.
+            stats.conflict_stats()
+
+
+class CompactEncodingTests(TransactionTestCase):
+    """Columnar series encoding and response compression."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        create_commodities(1960, 2020)
+
+    def test_encode_years(self):
+        self.assertEqual(encode_years(np.arange(1990, 2000)), {'start': 1990, 'step': 1, 'count': 10})
+        self.assertEqual(encode_years(np.array([1990, 1992, 1993])), [1990, 1992, 1993])
+        self.assertEqual(encode_years(np.array([2000])), {'start': 2000, 'step': 1, 'count': 1})
+        self.assertEqual(encode_years(np.array([], dtype=np.int64)), [])
+
+    def test_columnar_matches_default(self):
+        url = reverse('app:commodity-list')
+        default = self.client.get(url, {'commodity': 'cocoa'}).json()
+        columnar = self.client.get(url, {'commodity': 'cocoa', 'encoding': 'columnar'}).json()
+
+        years = columnar['years']
+        self.assertEqual(
+            [years['start'] + i * years['step'] for i in range(years['count'])],
+            default['years'],
+        )
+        self.assertEqual(columnar['prices'], default['prices'])
+
+    @override_settings(COMPRESSION_MIN_LENGTH=200)
+    def test_gzip_above_threshold(self):
+        url = reverse('app:dashboard_commodity_api')
+        response = self.client.get(url, {'commodity': 'gold_troy_oz'}, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        plain = self.client.get(url, {'commodity': 'gold_troy_oz'})
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    @skipUnless(brotli, 'needs the brotli package')
+    @override_settings(COMPRESSION_MIN_LENGTH=200)
+    def test_brotli_for_api_responses_only(self):
+        url = reverse('app:dashboard_commodity_api')
+        response = self.client.get(url, {'commodity': 'gold_troy_oz'}, HTTP_ACCEPT_ENCODING='gzip, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        plain = self.client.get(url, {'commodity': 'gold_troy_oz'})
+        self.assertEqual(brotli.decompress(response.content), plain.content)
+
+        # Pages with CSRF tokens keep gzip and its BREACH padding.
+        page = self.client.get(reverse('app:commodities'), HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertTrue(page['Content-Type'].startswith('text/html'))
+        self.assertEqual(page['Content-Encoding'], 'gzip')
+
+    def test_small_responses_uncompressed(self):
+        url = reverse('app:commodity-list')
+        response = self.client.get(url, {'commodity': 'unknown'}, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertNotIn('Content-Encoding', response)
+
+
+CONFLICT_HEADER = (
+    'conflict_id,location,side_a,side_a_id,side_a_2nd,side_b,side_b_id,side_b_2nd,territory_name,'
+    'year,intensity_level,cumulative_intensity,type_of_conflict,start_date,start_date2,start_prec2,'
+    'ep_end,ep_end_date\n'
+)
+
+
+def walk_plan(node):
+    yield node
+    for child in node.get('Plans', ()):
+        yield from walk_plan(child)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plans are checked on PostgreSQL')
+class ConflictQueryPlanTests(TransactionTestCase):
+    """
+    Every view query on app_conflict is planned on an index: no sequential
+    scan of the table and no hash aggregate over it. Seeded with enough
+    conflict-years that the planner would pick those without the indexes.
+    """
+
+    CONFLICTS = 2000
+    YEARS = (1961, 2024)
+
+    REQUESTS = [
+        ('app:conflict-list-api', {}),
+        ('app:conflict-list-api', {'year_from': 2000, 'year_to': 2005}),
+        ('app:conflict-list-api', {'type': 2}),
+        ('app:conflict-list-api', {'intensity': 2}),
+        ('app:correlation_rows', {'table': 'conflicts', 'year_from': 1990}),
+        ('app:correlation_rows', {'table': 'join', 'fields': 'year,conflict_id,location,cocoa'}),
+        ('app:correlations', {'table': 'conflicts'}),
+        ('app:main_dashboard', {}),
+    ]
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        create_commodities(1960, 2024)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO app_conflict (conflict_id, location, side_a, side_a_id, side_b, side_b_id, '
+                'year, intensity_level, cumulative_intensity, type_of_conflict) '
+                "SELECT c, 'Location ' || c %% 300, 'Government', c %% 7, 'Rebels', c::text, "
+                'y, 1 + (c + y) %% 2, (c * y) %% 2, 1 + c %% 4 '
+                'FROM generate_series(1, %s) c, generate_series(%s, %s) y',
+                [self.CONFLICTS, *self.YEARS],
+            )
+            # Fresh statistics and visibility map, as autovacuum would leave them.
+            cursor.execute('VACUUM ANALYZE app_conflict')
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            return cursor.fetchone()[0][0]['Plan']
+
+    def assertIndexedPlans(self, queries):
+        checked = 0
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or '"app_conflict"' not in sql:
+                continue
+            checked += 1
+            for node in walk_plan(self.explain(sql)):
+                self.assertFalse(
+                    node['Node Type'] == 'Seq Scan' and node.get('Relation Name') == 'app_conflict',
+                    f'Sequential scan of app_conflict for {sql}',
+                )
+                if node['Node Type'] == 'Aggregate' and node.get('Strategy') in ('Hashed', 'Mixed'):
+                    scanned = {child.get('Relation Name') for child in walk_plan(node)}
+                    self.assertNotIn('app_conflict', scanned, f'Hash aggregate over app_conflict for {sql}')
+        return checked
+
+    def assertIndexedView(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(self.assertIndexedPlans(queries.captured_queries), 0)
+        return response
+
+    def test_view_queries(self):
+        for name, params in self.REQUESTS:
+            with self.subTest(view=name, params=params):
+                self.assertIndexedView(reverse(name), params)
+
+    def test_next_pages(self):
+        # Later pages go through the keyset conditions.
+        first = self.client.get(reverse('app:conflict-list-api'), {'year_from': 2000}).json()
+        self.assertIndexedView(first['next'])
+        first = self.client.get(reverse('app:correlation_rows'), {'table': 'join'}).json()
+        self.assertIndexedView(reverse('app:correlation_rows'), {'table': 'join', 'after': first['next']})
+
+    def test_rollup_refresh(self):
+        with CaptureQueriesContext(connection) as queries:
+            refresh_conflict_stats({2000, 2001})
+
+        self.assertEqual(self.assertIndexedPlans(queries.captured_queries), 2)
+
+
+class ConflictCSVMixin:
+    def write_csv(self, *lines):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w') as file:
+            file.write(CONFLICT_HEADER + ''.join(line + '\n' for line in lines))
+        self.addCleanup(os.remove, path)
+        return path
+
+
+class ConflictImportTests(ConflictCSVMixin, TestCase):
+    """import_conflicts keeps one row per conflict-year and reports bad rows."""
+
+    def test_conflict_years(self):
+        path = self.write_csv(
+            '7,India,Gov,1,,GNLA,10,,Garo,2012,1,0,3,1997-05-29,11/15/2012,1,1,2012-12-21',
+            '7,India,Gov,1,,GNLA,10,,Garo,2012,1,0,3,1997-05-29,11/15/2012,1,1,2012-12-21',
+            '7,India,Gov,1,,GNLA,10,,Garo,2014,2,1,3,1997-05-29,2014-07-01,1,,',
+            '8,Peru,Gov,2,,Sendero,11,,,1955,1,0,3,,,,,',
+        )
+
+        result = import_conflicts(path, batch_size=2)
+
+        self.assertEqual((result.read, result.imported, result.duplicates, result.skipped), (4, 2, 1, 1))
+        self.assertEqual(list(Conflict.objects.order_by('year').values_list('conflict_id', 'year')), [(7, 2012), (7, 2014)])
+        conflict = Conflict.objects.get(year=2012)
+        self.assertEqual(conflict.start_date2, datetime.date(2012, 11, 15))
+        self.assertIsNone(conflict.side_a_2nd)
+        self.assertEqual(stats.yearly_totals(), [{'year': 2012, 'total': 1}, {'year': 2014, 'total': 1}])
+
+    def test_upsert(self):
+        import_conflicts(self.write_csv('7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,'))
+        import_conflicts(self.write_csv('7,India,Gov,1,,GNLA,10,,,2012,2,1,3,,,,,'))
+
+        self.assertEqual(Conflict.objects.get().intensity_level, 2)
+
+    def test_rejected_rows(self):
+        path = self.write_csv(
+            '1,X,Gov,1,,B,2,,,abc,1,0,3,,,,,',
+            '2,X,Gov,1,,B,2',
+            '3,X,Gov,1,,B,2,,,1999,,0,3,,,,,',
+            '4,X,Gov,1,,B,2,,,1999,1,0,3,,,,,',
+        )
+
+        result = import_conflicts(path)
+
+        self.assertEqual(result.imported, 1)
+        self.assertEqual(result.rejected_count, 3)
+        self.assertEqual([line for line, _ in result.rejected], [2, 3, 4])
+
+    def test_values_too_long(self):
+        path = self.write_csv(
+            '7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,',
+            f'8,Peru,Gov,2,{"x" * 1025},Sendero,11,,,2012,1,0,3,,,,,',
+            f'9,Chad,Gov,3,{"x" * 1024},FROLINAT,12,,,2012,1,0,3,,,,,',
+        )
+
+        result = import_conflicts(path)
+
+        self.assertEqual((result.imported, result.rejected), (2, [(3, 'side_a_2nd longer than 1024 characters')]))
+        self.assertFalse(Conflict.objects.filter(conflict_id=8).exists())
+        self.assertEqual(len(Conflict.objects.get(conflict_id=9).side_a_2nd), 1024)
+
+    def test_process_pool(self):
+        lines = [f'{i},X,Gov,1,,B,2,,,{1990 + i % 10},1,0,3,2000-01-01,,,,' for i in range(50)]
+
+        result = import_conflicts(self.write_csv(*lines), batch_size=7, workers=2)
+
+        self.assertEqual(result.imported, 50)
+        self.assertEqual(Conflict.objects.count(), 50)
+
+
+class ImportLedgerTests(ConflictCSVMixin, TransactionTestCase):
+    """Re-imports only write what changed and stamp only the affected years."""
+
+    ROWS = (
+        '7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,',
+        '7,India,Gov,1,,GNLA,10,,,2013,1,0,3,,,,,',
+        '8,Peru,Gov,2,,Sendero,11,,,1990,1,0,3,,,,,',
+    )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_unchanged_file_is_skipped(self):
+        path = self.write_csv(*self.ROWS)
+        self.assertEqual(import_conflicts(path).changeset.as_dict()['created'], 3)
+
+        result = import_conflicts(path)
+
+        self.assertIsNone(result.changeset)
+        self.assertEqual(result.read, 0)
+
+    def test_delta(self):
+        import_conflicts(self.write_csv(*self.ROWS))
+        result = import_conflicts(self.write_csv(
+            self.ROWS[0],
+            '7,India,Gov,1,,GNLA,10,,,2013,2,1,3,,,,,',
+            self.ROWS[2],
+            '9,Chad,Gov,3,,FROLINAT,12,,,1990,1,0,3,,,,,',
+        ))
+
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(result.changeset.as_dict(), {
+            'created': 1, 'updated': 1, 'removed': 0, 'unchanged': 2, 'years': [1990, 2013],
+        })
+        self.assertEqual(stats.yearly_intensity_counts(), [
+            {'year': 1990, 'intensity_level': 1, 'count': 2},
+            {'year': 2012, 'intensity_level': 1, 'count': 1},
+            {'year': 2013, 'intensity_level': 2, 'count': 1},
+        ])
+
+    def test_replace(self):
+        import_conflicts(self.write_csv(*self.ROWS))
+        result = import_conflicts(self.write_csv(*self.ROWS[:2]), replace=True)
+
+        self.assertEqual(result.changeset.as_dict()['years'], [1990])
+        self.assertFalse(Conflict.objects.filter(year=1990).exists())
+        self.assertEqual(stats.yearly_totals(), [{'year': 2012, 'total': 1}, {'year': 2013, 'total': 1}])
+
+    def test_repeated_key_across_batches(self):
+        changed = '7,India,Gov,1,,GNLA,10,,,2012,2,1,3,,,,,'
+        methods = ['insert', 'copy'] if copy_supported() else ['insert']
+        for method in methods:
+            for first, last, intensity in ((changed, self.ROWS[0], 1), (self.ROWS[0], changed, 2)):
+                with self.subTest(method=method, intensity=intensity):
+                    Conflict.objects.all().delete()
+                    import_conflicts(self.write_csv(*self.ROWS), full=True)
+
+                    # The repeats land in different batches.
+                    result = import_conflicts(self.write_csv(first, *self.ROWS[1:], last), batch_size=1, method=method)
+
+                    self.assertEqual(Conflict.objects.get(conflict_id=7, year=2012).intensity_level, intensity)
+                    self.assertEqual(result.changeset.as_dict()['updated'], intensity - 1)
+                    self.assertEqual(result.duplicates, 1)
+
+    def test_year_scoped_etag(self):
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        import_conflicts(self.write_csv(*self.ROWS))
+        bump_generation(import_conflicts(self.write_csv(*self.ROWS[:2], '8,Peru,Gov,2,,Sendero,11,,,1990,2,0,3,,,,,')).changeset.years)
+        url = reverse('app:conflict-list-api')
+
+        old = self.client.get(url, {'year_from': 2000})
+        changed = self.client.get(url, {'year_to': 2000})
+        self.assertNotEqual(old['ETag'], changed['ETag'])
+
+        bump_generation(import_conflicts(self.write_csv(*self.ROWS[:2], '8,Peru,Gov,2,,Sendero,11,,,1990,3,0,3,,,,,')).changeset.years)
+        self.assertEqual(self.client.get(url, {'year_from': 2000}, HTTP_IF_NONE_MATCH=old['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, {'year_to': 2000}, HTTP_IF_NONE_MATCH=changed['ETag']).status_code, 200)
+
+
+@skipUnless(copy_supported(), 'COPY loading needs PostgreSQL with psycopg 3')
+class ConflictCopyImportTests(ConflictCSVMixin, TestCase):
+    """The COPY path behaves like the batched upserts."""
+
+    def test_conflict_years(self):
+        path = self.write_csv(
+            '7,India,Gov,1,,GNLA,10,,Garo,2012,1,0,3,1997-05-29,11/15/2012,1,1,2012-12-21',
+            '7,India,Gov,1,,GNLA,10,,Garo,2012,2,0,3,1997-05-29,11/15/2012,1,1,2012-12-21',
+            '7,India,Gov,1,,GNLA,10,,Garo,2014,2,1,3,1997-05-29,2014-07-01,1,,',
+        )
+
+        result = import_conflicts(path, method='copy')
+
+        self.assertEqual((result.imported, result.duplicates), (2, 1))
+        self.assertEqual(Conflict.objects.get(year=2012).intensity_level, 2)
+        self.assertEqual(Conflict.objects.get(year=2012).start_date2, datetime.date(2012, 11, 15))
+
+    def test_upsert(self):
+        import_conflicts(self.write_csv('7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,'), method='copy')
+        import_conflicts(self.write_csv('7,India,Gov,1,,GNLA,10,,,2012,2,1,3,,,,,'), method='copy')
+
+        self.assertEqual(Conflict.objects.get().intensity_level, 2)
+
+    def test_replace(self):
+        import_conflicts(self.write_csv('7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,'))
+        import_conflicts(self.write_csv('8,Peru,Gov,2,,Sendero,11,,,1990,1,0,3,,,,,'), method='copy', replace=True)
+
+        self.assertEqual(list(Conflict.objects.values_list('conflict_id', flat=True)), [8])
+
+    def test_values_too_long(self):
+        path = self.write_csv(
+            '7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,',
+            f'8,Peru,Gov,2,{"x" * 1025},Sendero,11,,,2012,1,0,3,,,,,',
+        )
+
+        result = import_conflicts(path, method='copy')
+
+        self.assertEqual((result.imported, result.rejected_count), (1, 1))
+        self.assertEqual(list(Conflict.objects.values_list('conflict_id', flat=True)), [7])
+
+    def test_database_error(self):
+        row = (8, 'Peru', 'Gov', 2, 'x' * 1025, 'Sendero', '11', None, None, 2012, 1, 0, 3, None, None, None, None, None)
+
+        with self.assertRaisesMessage(DataImportError, 'Loading app_conflict with COPY failed'):
+            copy_into(Conflict, CONFLICT_HEADER.strip().split(','), [[row]], ['conflict_id', 'year'])
+        self.assertFalse(Conflict.objects.exists())
+
+
+class CommodityImportTests(SimpleTestCase):
+    """The commodity header is resolved once and prices are parsed per column."""
+
+    def parse(self, header, *rows):
+        dataset = CommodityDataset()
+        spec = dataset.prepare(header)
+        records, rejected, skipped = dataset.parse_chunk(spec, 2, [list(row) for row in rows])
+        return [dict(zip(dataset.fields(spec), record)) for record in records], rejected
+
+    def test_parse(self):
+        records, rejected = self.parse(
+            ['Year', 'Cocoa', 'Gold ($/troy oz)'],
+            ['1990', '1.27', '383.51'],
+            ['1991', ' 1.19 ', 'n/a'],
+            ['1992', '', '400'],
+        )
+
+        self.assertEqual(
+            [(r['year'], r['cocoa'], r['gold_troy_oz']) for r in records],
+            [(1990, 1.27, 383.51), (1991, 1.19, None), (1992, None, 400.0)],
+        )
+        self.assertIs(type(records[2]['gold_troy_oz']), float)
+        self.assertIs(type(records[2]['year']), int)
+        self.assertEqual(rejected, [])
+
+    def test_plain_header(self):
+        with open(settings.BASE_DIR / 'data' / 'commodity.csv', newline='') as f:
+            header, row = itertools.islice(csv.reader(f), 2)
+
+        records, rejected = self.parse(header, row)
+
+        self.assertEqual(len(records[0]), len(header))
+        self.assertEqual(
+            (records[0]['year'], records[0]['crude_oil_average_bbl'], records[0]['cocoa'],
+             records[0]['natural_gas_index_2010_100'], records[0]['silver_troy_oz']),
+            (1960, 1.63, 0.59, None, 0.91),
+        )
+        self.assertEqual(rejected, [])
+
+    def test_unknown_columns(self):
+        with self.assertRaisesMessage(CommodityImportError, 'Unknown columns: Unobtainium, Moonrock'):
+            CommodityDataset().prepare(['Year', 'Cocoa', 'Unobtainium', 'Moonrock'])
+
+    def test_invalid_year(self):
+        records, rejected = self.parse(['Year', 'Cocoa'], ['1990', '1'], ['abc', '2'], ['1991', '1', '5'])
+
+        self.assertEqual([r['year'] for r in records], [1990])
+        self.assertEqual(rejected, [(3, "invalid year: 'abc'"), (4, 'expected 2 columns, got 3')])
+
+
+class ImportEngineTests(ConflictCSVMixin, TestCase):
+    """Source adapters, dry runs and chunked transactions of the import engine."""
+
+    ROW = '7,India,Gov,1,,GNLA,10,,,2012,1,0,3,,,,,'
+
+    def test_gzip_source(self):
+        fd, path = tempfile.mkstemp(suffix='.csv.gz')
+        os.close(fd)
+        self.addCleanup(os.remove, path)
+        with gzip.open(path, 'wt') as file:
+            file.write(CONFLICT_HEADER + self.ROW + '\n')
+
+        self.assertEqual(import_conflicts(path).imported, 1)
+        self.assertEqual(Conflict.objects.get().conflict_id, 7)
+
+    def test_dry_run(self):
+        result = import_conflicts(self.write_csv(self.ROW), dry_run=True)
+
+        self.assertEqual(result.changeset.as_dict()['created'], 1)
+        self.assertFalse(Conflict.objects.exists())
+        self.assertFalse(ImportedFile.objects.exists())
+
+    def test_chunked(self):
+        lines = [f'{i},X,Gov,1,,B,2,,,{1990 + i},1,0,3,,,,,' for i in range(5)]
+
+        result = import_conflicts(self.write_csv(*lines), batch_size=2, chunked=True)
+
+        self.assertEqual((result.batches, result.imported), (3, 5))
+        self.assertEqual(len(stats.yearly_totals()), 5)
+
+    def test_full_replace_needs_one_transaction(self):
+        with self.assertRaises(DataImportError):
+            import_conflicts(self.write_csv(self.ROW), chunked=True, replace=True, full=True)
+
+    def test_import_data_command(self):
+        fd, path = tempfile.mkstemp(suffix='.csv')
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write('Year,"Cocoa",Gold ($/troy oz)\n1990,1.27,383.51\n')
+        self.addCleanup(os.remove, path)
+        out = StringIO()
+
+        with mock.patch('app.management.commands.import_data.schedule_heatmap_refresh') as refresh:
+            call_command('import_data', 'commodities', path, workers=1, stdout=out)
+
+        refresh.assert_called_once()
+
+        self.assertEqual(Commodity.objects.get().cocoa, 1.27)
+        self.assertIn('Successfully imported 1 commodities', out.getvalue())
+
+    def test_import_data_command_database_error(self):
+        lines = [f'{i},X,Gov,1,,B,2,,,{1990 + i},1,0,3,,,,,' for i in range(3)]
+        path = self.write_csv(*lines)
+
+        write = importing._Writer.write
+
+        def fail_second_batch(writer, records):
+            if writer.result.batches == 2:
+                raise IntegrityError('duplicate key')
+            return write(writer, records)
+
+        with mock.patch.object(importing._Writer, 'write', autospec=True, side_effect=fail_second_batch):
+            with self.assertRaisesMessage(CommandError, 'Writing conflicts failed in batch 2: duplicate key'):
+                call_command('import_data', 'conflicts', path, batch_size=2, workers=1, stdout=StringIO())
+
+        self.assertFalse(Conflict.objects.exists())
+        self.assertFalse(ImportedFile.objects.exists())
+
+
+class ConflictPaginationTests(TestCase):
+    """The conflict list pages on the full (year, conflict_id) key."""
+
+    @classmethod
+    def setUpTestData(cls):
+        # More rows in 2000 than DRF's CursorPagination could page through
+        # (it offsets within a year, up to 1000 rows).
+        Conflict.objects.bulk_create(
+            Conflict(conflict_id=i, location='Location', side_a='Government', side_a_id=0, side_b='Rebels',
+                     side_b_id=str(i), year=1999 + (i > 10) + (i > 2510), intensity_level=1,
+                     cumulative_intensity=0, type_of_conflict=3)
+            for i in range(1, 2521)
+        )
+        cls.user = User.objects.create_user('analyst', password='secret')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def walk(self, url, params, direction='next'):
+        keys = []
+        page = self.client.get(url, params).json()
+        while True:
+            results = page['results']
+            keys.extend((row['year'], row['conflict_id']) for row in (results if direction == 'next' else reversed(results)))
+            if page[direction] is None:
+                return keys, page
+            page = self.client.get(page[direction]).json()
+
+    def test_pages_through_a_large_year(self):
+        url = reverse('app:conflict-list-api')
+        expected = list(Conflict.objects.filter(year=2000).order_by('conflict_id').values_list('year', 'conflict_id'))
+        self.assertEqual(len(expected), 2500)
+
+        for page_size in (1000, 300):
+            with self.subTest(page_size=page_size):
+                keys, last = self.walk(url, {'year_from': 2000, 'year_to': 2000, 'page_size': page_size})
+                self.assertEqual(keys, expected)
+
+                # And back again from the last page.
+                back, first = self.walk(last['previous'], {}, direction='previous')
+                self.assertEqual(back[::-1], expected[:-len(last['results'])])
+                self.assertIsNone(first['previous'])
+                self.assertEqual(len(first['results']), page_size)
+
+    def test_pages_across_years(self):
+        keys, _ = self.walk(reverse('app:conflict-list-api'), {'page_size': 7})
+        expected = list(Conflict.objects.order_by('year', 'conflict_id').values_list('year', 'conflict_id'))
+        self.assertEqual(keys, expected)
+
+    def test_invalid_cursor(self):
+        for cursor in ('nonsense', 'bj0x'):
+            response = self.client.get(reverse('app:conflict-list-api'), {'cursor': cursor})
+            self.assertEqual(response.status_code, 404)
+
+
+class FastReadSerializerTests(TestCase):
+    """The fast path must render byte-identical JSON to the ModelSerializers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_commodities(1990, 1995)
+        Commodity.objects.create(year=1996)
+        create_conflicts(30)
+        Conflict.objects.filter(conflict_id__lte=10).update(
+            start_date=datetime.date(1989, 1, 31),
+            start_date2=datetime.date(1990, 12, 1),
+            side_a_2nd='Allied government',
+            territory_name='Territory',
+            start_prec2=1,
+            ep_end=1,
+            ep_end_date=datetime.date(1995, 6, 30),
+        )
+
+    def assertSameJSON(self, serializer_class, queryset, fields=None):
+        if fields is None:
+            expected = serializer_class(queryset, many=True).data
+        else:
+            expected = serializer_class(queryset, many=True, fields=fields).data
+        fast = get_fast_serializer(serializer_class, fields)
+        actual = fast.to_representation(list(fast.values(queryset)))
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_conflicts(self):
+        self.assertSameJSON(ConflictSerializer, Conflict.objects.order_by('year', 'conflict_id'))
+
+    def test_conflicts_sparse_fieldset(self):
+        self.assertSameJSON(
+            ConflictSerializer,
+            Conflict.objects.order_by('conflict_id'),
+            fields=('year', 'start_date', 'location'),
+        )
+
+    def test_commodities(self):
+        self.assertSameJSON(CommoditySerializer, Commodity.objects.order_by('year'))
+
+    def test_empty(self):
+        self.assertSameJSON(ConflictSerializer, Conflict.objects.none())
+
+    def test_conflict_list_api(self):
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+
+        response = self.client.get(reverse('app:conflict-list-api'), {'page_size': 25})
+
+        expected = ConflictSerializer(Conflict.objects.order_by('year', 'conflict_id')[:25], many=True).data
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(JSONRenderer().render(response.json()['results']), JSONRenderer().render(expected))
+
+
+class HeatmapTests(TestCase):
+    """The correlation heatmap renders whatever data has been imported."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_no_conflicts(self):
+        create_commodities(1990, 1995)
+        bump_generation()
+
+        png = refresh_heatmap()
+
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        self.assertTrue(CorrelationHeatmap.objects.filter(webp__isnull=False).exists())
+
+
+class HeatmapViewTests(TransactionTestCase):
+    """Requests never wait for the heatmap to render, nor retry a failed render."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.addCleanup(heatmap._failed_generations.clear)
+        user = User.objects.create_user('analyst', password='secret')
+        self.client.force_login(user)
+        create_commodities(1990, 1995)
+        create_conflicts(10)
+        bump_generation()
+        self.url = reverse('app:correlation_heatmap')
+
+    def wait_for_render(self):
+        for thread in list(heatmap._refresh_threads.values()):
+            thread.join()
+
+    def test_renders_in_background(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '30')
+        self.wait_for_render()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_failed_render_is_not_retried(self):
+        with mock.patch('app.heatmap.render_correlation_heatmap', side_effect=RuntimeError) as render:
+            with self.assertLogs('app.heatmap', 'ERROR'):
+                self.assertEqual(self.client.get(self.url).status_code, 503)
+                self.wait_for_render()
+            self.assertEqual(self.client.get(self.url).status_code, 503)
+            self.wait_for_render()
+
+        self.assertEqual(render.call_count, 1)
+
+
+class SyntheticDataTests(TestCase):
+    """Generated data has the requested size and shape and imports like a real file."""
+
+    def test_conflict_rows(self):
+        rows = list(conflict_rows(5000, 1990, 1999, seed=3))
+
+        self.assertEqual(len(rows), 5000)
+        self.assertEqual(len({(row[0], row[9]) for row in rows}), 5000)
+        self.assertTrue(all(1990 <= row[9] <= 1999 for row in rows))
+        self.assertEqual(rows, list(conflict_rows(5000, 1990, 1999, seed=3)))
+
+    def test_commodity_rows(self):
+        rows = list(commodity_rows(1990, 1999))
+
+        self.assertEqual([row[0] for row in rows], list(range(1990, 2000)))
+        self.assertTrue(all(price > 0 for row in rows for price in row[1:]))
+
+    def test_command(self):
+        with mock.patch('app.management.commands.import_data.schedule_heatmap_refresh'):
+            call_command('generate_data', conflict_years=300, first_year=1990, last_year=2000,
+                         workers=1, stdout=StringIO())
+
+        self.assertEqual(Conflict.objects.count(), 300)
+        self.assertEqual(Commodity.objects.count(), 11)
+        self.assertEqual(sum(row['total'] for row in stats.yearly_totals()), 300)
+
+
+class LoadTestTests(LiveServerTestCase):
+    """The load driver logs in and reports on every URL of the app."""
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, p) for p in (0.5, 0.95, 0.99)], [50, 95, 99])
+        self.assertEqual(percentile([7], 0.99), 7)
+
+    def test_report(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        User.objects.create_user('analyst', password='secret')
+        create_commodities(1990, 1995)
+        create_conflicts(50)
+        bump_generation()
+        refresh_heatmap()
+
+        report = run_load_test(self.live_server_url, 'analyst', 'secret', requests=3, concurrency=2)
+
+        self.assertEqual(set(report['endpoints']), {name for name, _ in endpoints()})
+        for name, result in report['endpoints'].items():
+            with self.subTest(name):
+                self.assertEqual(result['requests'], 3)
+                self.assertEqual(result['errors'], 0)
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertLessEqual(result['p95_ms'], result['p99_ms'])
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import CorrelationView
 from . import views
-from .api_views import ConflictYearlyDataAPI, ConflictListAPI, ConflictIntensityDataApi, ConflictTypesDataApi, CommodityListAPI
+from .api_views import ConflictYearlyDataAPI, ConflictListAPI, ConflictIntensityDataApi, ConflictTypesDataApi, ConflictStatsAPI, CommodityListAPI, CommoditySeriesAPI
 
 app_name = 'app'
 
@@ -12,15 +12,20 @@ urlpatterns = [
     path('api/dashboard/conflict/', views.dashboard_conflict_api, name='dashboard_conflict_api'),
 
     path('correlations/', CorrelationView.as_view(), name='correlations'),
+    path('correlations/rows/', views.correlation_rows_api, name='correlation_rows'),
+    path('correlations/export/', views.correlation_export, name='correlation_export'),
     path('api/conflict-data/', ConflictYearlyDataAPI.as_view(), name='conflict_data_api'),
     path('api/conflicts/', ConflictListAPI.as_view(), name='conflict-list-api'),
     path('api/conflict-intensity/', ConflictIntensityDataApi.as_view(), name='conflict-intensity-api'),
     path('api/conflict-types/', ConflictTypesDataApi.as_view(), name='conflict-type-api'),
+    path('api/conflict-stats/', ConflictStatsAPI.as_view(), name='conflict-stats-api'),
     path('api/commodities/', CommodityListAPI.as_view(), name='commodity-list'),
+    path('api/commodities/series/', CommoditySeriesAPI.as_view(), name='commodity-series'),
 
     path('commodities/', views.commodity_dashboard, name='commodities'),
     path('conflicts/', views.conflict_dashboard, name='conflicts'),
     path('conflicts_vs_commodities/', views.conflicts_vs_commodities, name='conflicts_vs_commodities'),
+    path('conflicts_vs_commodities/heatmap/', views.correlation_heatmap_image, name='correlation_heatmap'),
 
     path('login/', views.login_view, name='login'),
     path('register/', views.register_view, name='register'),
@@ -0,0 +1,12 @@
+"""
+Root URL configuration for requests served through ASGI (see asgi.py and
+app.middleware.async_views_middleware): the same routes as urls.py, with the
+app's JSON chart endpoints served by async views.
+"""
+from django.contrib import admin
+from django.urls import path, include
+
+urlpatterns = [
+    path('admin/', admin.site.urls),
+    path('', include('app.async_urls', namespace='app')),
+]
@@ -44,12 +44,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'app.middleware.async_views_middleware',
 ]
 
 ROOT_URLCONF = 'integration_project.urls'
@@ -83,10 +85,50 @@ DATABASES = {
         'HOST': 'localhost',
         'PASSWORD': 'integration',
         'PORT': '5432'
-        
+
     }
 }
 
+# Connection pooling with psycopg 3's pool (needs psycopg-pool). Each server
+# process keeps DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE open connections and a
+# request waits up to DB_POOL_TIMEOUT seconds for a free one; connections
+# are replaced after DB_POOL_MAX_LIFETIME seconds.
+DB_POOL = True
+DB_POOL_MIN_SIZE = 2
+DB_POOL_MAX_SIZE = 10
+DB_POOL_TIMEOUT = 10
+DB_POOL_MAX_LIFETIME = 1800
+
+if DB_POOL:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_lifetime': DB_POOL_MAX_LIFETIME,
+        },
+    }
+else:
+    # Without the pool, keep each thread's connection for up to a minute
+    # instead of opening one per request. (The two can't be combined.)
+    DATABASES['default']['CONN_MAX_AGE'] = 60
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Optional read replica (see app/routers.py): read-only views and REST API
+# GETs read from it, everything else uses 'default'. Set to the settings
+# that differ from 'default', e.g. {'HOST': 'replica.internal'}.
+DB_REPLICA = None
+
+# After an import, keep reading from the primary for this many seconds so
+# the new data is visible before the replica has replayed it (0: off). The
+# time of the import is read from the primary, so every web process sees it.
+REPLICA_PIN_SECONDS = 0
+
+if DB_REPLICA:
+    DATABASES['replica'] = {**DATABASES['default'], **DB_REPLICA, 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['app.routers.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,3 +170,6 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Responses smaller than this many bytes are sent uncompressed.
+COMPRESSION_MIN_LENGTH = 1024